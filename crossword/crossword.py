@@ -1,3 +1,7 @@
+import json
+import os
+
+
 class Variable():
 
     ACROSS = "across"
@@ -57,9 +61,9 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, and index it by length and letters
+        self.index = WordIndex.for_file(words_file)
+        self.words = set(self.index.words)
 
         # Determine variable set
         self.variables = set()
@@ -131,3 +135,161 @@ class Crossword():
             v for v in self.variables
             if v != var and self.overlaps[v, var]
         )
+
+
+class WordIndex():
+    """
+    Index over the words of a vocabulary.
+
+    The words are numbered shortest first, so that any set of them is a
+    bitset: an int whose bit k is set if it holds words[k]. The words of
+    each length, and the words of each length with each letter at each
+    position, are kept as bitsets, so that asking for "words of length L
+    with letter c at i" is a dictionary lookup.
+    """
+
+    def __init__(self, words, lengths, buckets):
+        self.words = words
+        self.lengths = lengths
+        self.buckets = buckets
+        self.numbers = {word: k for k, word in enumerate(words)}
+
+    @classmethod
+    def build(cls, words):
+        """Return an index over the iterable `words`."""
+        words = sorted(words, key=lambda word: (len(word), word))
+
+        # Words of one length are numbered in a row, from `start`, so
+        # the bitsets of their letters are built as bytes from there
+        lengths = dict()
+        buckets = dict()
+        start = 0
+        while start < len(words):
+            length = len(words[start])
+            stop = start
+            while stop < len(words) and len(words[stop]) == length:
+                stop += 1
+            size = (stop - start + 7) // 8
+
+            for position in range(length):
+                letters = dict()
+                for k in range(stop - start):
+                    letter = words[start + k][position]
+                    if letter not in letters:
+                        letters[letter] = bytearray(size)
+                    letters[letter][k >> 3] |= 1 << (k & 7)
+                buckets[length, position] = {
+                    letter: int.from_bytes(bits, "little") << start
+                    for letter, bits in letters.items()
+                }
+            lengths[length] = ((1 << (stop - start)) - 1) << start
+            start = stop
+        return cls(words, lengths, buckets)
+
+    @classmethod
+    def for_file(cls, words_file):
+        """
+        Return the index over the words (uppercased, one per line) of
+        `words_file`, loaded from beside it when it was built for the same
+        file, and built (and saved there) otherwise.
+        """
+        path = os.path.splitext(words_file)[0] + ".index"
+        stat = os.stat(words_file)
+        key = [stat.st_mtime_ns, stat.st_size]
+
+        index = cls.load(path, key)
+        if index is None:
+            with open(words_file) as f:
+                index = cls.build(set(f.read().upper().splitlines()))
+            try:
+                index.save(path, key)
+            except OSError:
+                pass
+        return index
+
+    def with_length(self, length):
+        """Return the bitset of the words of `length` letters."""
+        return self.lengths.get(length, 0)
+
+    def letters(self, length, position):
+        """
+        Return a dictionary from every letter that words of `length`
+        letters have at `position` to the bitset of those words.
+        """
+        return self.buckets.get((length, position), dict())
+
+    def with_letter(self, length, position, letter):
+        """
+        Return the bitset of the words of `length` letters with `letter`
+        at `position`.
+        """
+        return self.letters(length, position).get(letter, 0)
+
+    def first(self, length):
+        """Return the number of the first word of `length` letters."""
+        bitset = self.with_length(length)
+        return (bitset & -bitset).bit_length() - 1
+
+    def bit(self, word):
+        """Return the bitset of `word` alone."""
+        return 1 << self.numbers[word]
+
+    def words_in(self, bitset):
+        """Return the words of `bitset`, in order."""
+        words = []
+        while bitset:
+            lowest = bitset & -bitset
+            words.append(self.words[lowest.bit_length() - 1])
+            bitset ^= lowest
+        return words
+
+    def save(self, path, key):
+        """
+        Save the index to `path` as JSON, along with the `key` of the
+        words file it was built from.
+        """
+        # Save each bitset in hexadecimal, shifted down to the first word
+        # of its length
+        letters = []
+        for (length, position), bitsets in sorted(self.buckets.items()):
+            first = self.first(length)
+            letters.append([length, position, {
+                letter: format(bitset >> first, "x")
+                for letter, bitset in bitsets.items()
+            }])
+        with open(path, "w") as f:
+            json.dump({"key": key, "words": self.words, "letters": letters}, f)
+
+    @classmethod
+    def load(cls, path, key):
+        """
+        Load the index saved at `path`, or return None if there is none or
+        it was saved for another `key`.
+        """
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get("key") != key:
+            return None
+
+        # Words of one length are numbered in a row
+        words = saved["words"]
+        firsts = dict()
+        counts = dict()
+        for k, word in enumerate(words):
+            firsts.setdefault(len(word), k)
+            counts[len(word)] = counts.get(len(word), 0) + 1
+        lengths = {
+            length: ((1 << counts[length]) - 1) << first
+            for length, first in firsts.items()
+        }
+
+        buckets = dict()
+        for length, position, bitsets in saved["letters"]:
+            buckets[length, position] = {
+                letter: int(bitset, 16) << firsts[length]
+                for letter, bitset in bitsets.items()
+            }
+        return cls(words, lengths, buckets)
@@ -1,5 +1,6 @@
 import sys
 
+from collections import deque
 from crossword import Variable, Crossword
 import math
 
@@ -11,11 +12,55 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+        self.index = crossword.index
+
+        # Domains are bitsets over the words of the index: bit k of a
+        # domain is set if it holds self.index.words[k]
+        all_words = (1 << len(self.index.words)) - 1
         self.domains = {
-            var: self.crossword.words.copy()
+            var: all_words
+            for var in self.crossword.variables
+        }
+        self.neighbors = {
+            var: self.crossword.neighbors(var)
             for var in self.crossword.variables
         }
 
+        # Every change to a domain is recorded as (variable, old domain),
+        # so that backtracking undoes changes back to a mark in the trail
+        self.trail = []
+
+        # Per arc (x, y): the domain revise last left x with, and the
+        # domain of y it was revised against
+        self.revised = dict()
+
+    def count(self, domain):
+        """
+        Return the number of words in a `domain` bitset.
+        """
+        return bin(domain).count("1")
+
+    def domain_words(self, domain):
+        """
+        Return the words in a `domain` bitset, in order.
+        """
+        return self.index.words_in(domain)
+
+    def prune(self, var, domain):
+        """
+        Set the domain of `var` to `domain`, recording the old one.
+        """
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = domain
+
+    def restore(self, mark):
+        """
+        Undo every change to domains made since the trail was `mark` long.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -91,7 +136,8 @@ class CrosswordCreator():
         Enforce node and arc consistency, and then solve the CSP.
         """
         self.enforce_node_consistency()
-        self.ac3()
+        if not self.ac3():
+            return None
         return self.backtrack(dict())
 
     def enforce_node_consistency(self):
@@ -101,11 +147,7 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for var in self.domains:
-            to_be_removed = set()
-            for word in self.domains[var]:
-                if len(word) != var.length:
-                    to_be_removed.add(word)
-            self.domains[var] -= to_be_removed
+            self.domains[var] &= self.index.with_length(var.length)
 
     def revise(self, x, y):
         """
@@ -116,18 +158,31 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
-        to_be_removed = set()
         overlaps = self.crossword.overlaps[x, y]
-        if overlaps:
-            for x_word in self.domains[x]:
-                if not any(y_word[overlaps[1]] == x_word[overlaps[0]]
-                           for y_word in self.domains[y]):
-                    to_be_removed.add(x_word)
-                    revised = True
-        self.domains[x] -= to_be_removed
+        if not overlaps:
+            return False
+
+        # If y has not changed since x was last revised against it, and x
+        # only lost words since, every word of x is still supported
+        last = self.revised.get((x, y))
+        if (last is not None and last[1] == self.domains[y]
+                and not self.domains[x] & ~last[0]):
+            return False
 
-        return revised
+        # Keep the words of x with a letter at the overlap that some word
+        # of y also has there
+        x_letters = self.index.letters(x.length, overlaps[0])
+        y_letters = self.index.letters(y.length, overlaps[1])
+        supported = 0
+        for letter, y_words in y_letters.items():
+            if self.domains[y] & y_words:
+                supported |= x_letters.get(letter, 0)
+        domain = self.domains[x] & supported
+        self.revised[x, y] = (domain, self.domains[y])
+        if domain == self.domains[x]:
+            return False
+        self.prune(x, domain)
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -142,20 +197,31 @@ class CrosswordCreator():
             # Create initial queue
             arcs = []
             for var in self.crossword.variables:
-                for neighbor in self.crossword.neighbors(var):
+                for neighbor in self.neighbors[var]:
                     arcs.append((var, neighbor))
 
-        while arcs:
+        # Arcs waiting in the queue, which are never queued twice
+        queue = deque()
+        pending = set()
+        for arc in arcs:
+            if arc not in pending:
+                queue.append(arc)
+                pending.add(arc)
+
+        while queue:
             # Dequeue first element and enforce arc consistency
-            (x, y) = arcs.pop(0)
+            (x, y) = queue.popleft()
+            pending.remove((x, y))
             if self.revise(x, y):
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
                     # The domain for a variable is empty,
                     # hence, this crossword is impossible
                     return False
-                for z in self.crossword.neighbors(x) - {y}:
+                for z in self.neighbors[x]:
                     # Queue new arcs
-                    arcs.append((z, x))
+                    if z != y and (z, x) not in pending:
+                        queue.append((z, x))
+                        pending.add((z, x))
 
         # Arc consistency was succesfully enforced for all variables
         return True
@@ -186,10 +252,10 @@ class CrosswordCreator():
             if len(assignment[var]) != var.length:
                 return False
             # Check for conflicting characters with neighbors
-            for neighbor in self.crossword.neighbors(var):
+            for neighbor in self.neighbors[var]:
                 # Check if neighbor is assigned to some word
                 if neighbor not in assignment:
-                    break
+                    continue
                 overlaps = self.crossword.overlaps[var, neighbor]
                 if assignment[var][overlaps[0]] != assignment[neighbor][overlaps[1]]:
                     return False
@@ -203,37 +269,26 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        values = []
-        n_values = []
-        neighbors = self.crossword.neighbors(var)
-        for word in self.domains[var]:
+        # Skip neighbors that already have a value assigned to them
+        neighbors = [
+            neighbor for neighbor in self.neighbors[var]
+            if neighbor not in assignment
+        ]
+        n_values = dict()
+        for word in self.domain_words(self.domains[var]):
             n = 0
             for neighbor in neighbors:
-                if neighbor in assignment:
-                    # This neighbor already has a value assigned to it
-                    continue
-                overlaps = self.crossword.overlaps(var, neighbor)
-                for neigh_word in self.domains[neighbor]:
-                    if word[overlaps[0]] != neigh_word[overlaps[1]]:
-                        n += 1
-            # If that's the first word, just add it to the list
-            if not values:
-                values.append(word)
-                n_values.append(n)
-            else:
-                # Look for the right index, where the word should be inserted
-                list_modified = False
-                for index, num in enumerate(n_values):
-                    if n < num:
-                        list_modified = True
-                        n_values.insert(index, n)
-                        values.insert(index, word)
-                        break
-                if not list_modified:
-                    values.append(word)
-                    n_values.append(n)
-
-        return values
+                # Words of the neighbor without this word's letter where
+                # they overlap are ruled out
+                overlaps = self.crossword.overlaps[var, neighbor]
+                n += self.count(
+                    self.domains[neighbor] & ~self.index.with_letter(
+                        neighbor.length, overlaps[1], word[overlaps[0]]
+                    )
+                )
+            n_values[word] = n
+
+        return sorted(n_values, key=n_values.get)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -255,14 +310,14 @@ class CrosswordCreator():
                 continue
             # Choose variable with the minimum number of remaining values
             # in its domain
-            n_values = len(self.domains[var])
+            n_values = self.count(self.domains[var])
             if n_values < chosen_n:
                 chosen_var = var
                 chosen_n = n_values
-                chosen_degree = len(self.crossword.neighbors(var))
+                chosen_degree = len(self.neighbors[var])
             # If tied, choose the one with the largest degree
             elif n_values == chosen_n:
-                degree = len(self.crossword.neighbors(var))
+                degree = len(self.neighbors[var])
                 if degree > chosen_degree:
                     chosen_var = var
                     chosen_n = n_values
@@ -278,18 +333,31 @@ class CrosswordCreator():
         `assignment` is a mapping from variables (keys) to words (values).
 
         If no assignment is possible, return None.
+
+        Arc consistency is maintained along the way: every value tried
+        leaves only itself in the domain of its variable, and the words
+        of the other variables that no longer fit are pruned before going
+        deeper, then restored from the trail when backtracking.
         """
         if self.assignment_complete(assignment):
             return assignment
 
         var = self.select_unassigned_variable(assignment)
 
-        for value in self.domains[var]:
+        for value in self.order_domain_values(var, assignment):
             assignment[var] = value
             if self.consistent(assignment):
-                result = self.backtrack(assignment)
-                if result:
-                    return result
+                mark = len(self.trail)
+                self.prune(var, self.index.bit(value))
+                arcs = [
+                    (neighbor, var) for neighbor in self.neighbors[var]
+                    if neighbor not in assignment
+                ]
+                if self.ac3(arcs):
+                    result = self.backtrack(assignment)
+                    if result:
+                        return result
+                self.restore(mark)
             assignment.pop(var)
         return None
 
@@ -1,61 +1,61 @@
-import csv
+import heapq
+import multiprocessing
+import os
 import sys
+import threading
 
-from util import Node, StackFrontier, QueueFrontier
-
-# Maps names to a set of corresponding person_ids
-names = {}
-
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
-
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
-
-
-def load_data(directory):
-    """
-    Load data from CSV files into memory.
-    """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+from landmarks import load_index
+from nameindex import NameIndex
+from store import GraphStore
+from util import Node, IndexedQueueFrontier, LRUCache
+
+# People, movies and who starred in what, interned to integer indexes
+graph = GraphStore()
+
+# Landmark distance index for the graph, if one was built for it
+landmarks = None
+
+# Typo-tolerant index over people's names, loaded on first use (see
+# `get_name_index`), since only name searches need it
+name_index = None
+name_index_lock = threading.Lock()
+
+# Frozen neighbor sets of recently expanded people, by person index
+neighbor_cache = LRUCache(maxsize=4096)
+
+# Arguments the graph was loaded with, so spawned workers can load it too
+data_source = None
+
+
+def load_data(directory, min_year=None, max_year=None, min_cast=None):
+    """
+    Load data from CSV files into memory, reusing the binary snapshot
+    of a previous run while the CSV files are unchanged.
+
+    The optional filters restrict the graph to movies released from
+    `min_year` to `max_year` with at least `min_cast` stars.
+
+    Also loads the landmark index built by `landmarks.py`, if it is
+    up to date with the CSV files and no filter is given.
+    """
+    global graph, landmarks, name_index, data_source
+    graph = GraphStore.load(directory, min_year, max_year, min_cast)
+    filtered = any(value is not None
+                   for value in (min_year, max_year, min_cast))
+    landmarks = None if filtered else load_index(directory)
+    data_source = (directory, min_year, max_year, min_cast)
+    with name_index_lock:
+        name_index = None
+    neighbor_cache.clear()
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    # Pick the search strategy with an optional flag
+    args = [arg for arg in sys.argv[1:] if arg != "--bidirectional"]
+    bidirectional = len(args) != len(sys.argv) - 1
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [directory] [--bidirectional]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
@@ -69,7 +69,8 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=bidirectional,
+                         landmarks=None if bidirectional else landmarks)
 
     if path is None:
         print("Not connected.")
@@ -78,89 +79,415 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index[path[i][1]]]
+            person2 = graph.person_names[graph.person_index[path[i + 1][1]]]
+            movie = graph.movie_titles[graph.movie_index[path[i + 1][0]]]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, landmarks=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is True, the search grows from both ends
+    (see `bidirectional_shortest_path`). Otherwise, if a `landmarks`
+    index is given, the search is an A* guided by it
+    (see `landmark_shortest_path`).
+
     If no possible path, returns None.
     """
-    # Initialize frontier
-    frontier = QueueFrontier()
-
-    # Initialize set to store states already explored
-    explored_pairs = set()
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+    if landmarks is not None:
+        return landmark_shortest_path(source, target, landmarks)
 
-    # Get source neighbors and populate the frontier
-    neighbors = neighbors_for_person(source)
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        return []
 
-    for pair in neighbors:
-        # Check not to add source to the frontier
-        if pair[1] != source:
-            # Check if a connection was found already on the initial neighbors
-            if pair[1] == target:
-                return [pair]
-            frontier.add(Node(pair[1], None, pair[0]))
-        # Add the pairs (movie_id, source) to the explored_pairs
-        if not pair[0] in explored_pairs:
-            explored_pairs.add((pair[0], source))
+    # Initialize frontier with the source, and remember everyone reached
+    frontier = IndexedQueueFrontier()
+    frontier.add(Node(source, None, None))
+    reached = {source}
 
     # Iterate until frontier gets empty
     while not frontier.empty():
         # Expand next node in the frontier
         node = frontier.remove()
 
-        neighbors = neighbors_for_person(node.state)
-        # Remove from neighbors the current node
-        neighbors.remove((node.action, node.state))
+        for movie, person in neighbors_for_index(node.state):
+            if person in reached:
+                continue
+            reached.add(person)
+            child = Node(person, node, movie)
 
-        for pair in neighbors:
             # Check if target was found among neighbors
-            if pair[1] == target:
+            if person == target:
                 # Create path from target back to source
-                path = [pair]
-                while True:
-                    # Get node parents until we get to the first one (node with no parent)
-                    path.append((node.action, node.state))
-                    if node.parent:
-                        node = node.parent
-                    else:
-                        break
+                path = []
+                while child.parent is not None:
+                    path.append((graph.movie_ids[child.action],
+                                 graph.person_ids[child.state]))
+                    child = child.parent
 
                 # Invert list to get source to target
                 return path[::-1]
-            else:
-                # Add current neighbor to the frontier
-                if (not frontier.contains_pair(pair[0], pair[1])) and (pair not in explored_pairs):
-                    frontier.add(Node(pair[1], node, pair[0]))
 
-        # Add state to explored states
-        explored_pairs.add((node.action, node.state))
+            # Add current neighbor to the frontier
+            frontier.add(child)
+
+    # If no path was return, return None
+    return None
+
+
+def distance(source, target):
+    """
+    Returns the degrees of separation between the people with IMDB ids
+    `source` and `target`, or None if they are not connected.
+
+    The landmark index answers without searching when its bounds meet;
+    otherwise the distance is that of a shortest path, searched for with
+    A* over the index if there is one, and bidirectionally if not.
+    """
+    if landmarks is not None:
+        hops = landmarks.distance(graph.person_index[source],
+                                  graph.person_index[target])
+        if hops == -1:
+            return None
+        if hops is not None:
+            return hops
+    path = shortest_path(source, target, bidirectional=landmarks is None,
+                         landmarks=landmarks)
+    return None if path is None else len(path)
+
+
+def landmark_shortest_path(source, target, landmarks):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using A* with the
+    lower bounds of a `landmarks` index as its heuristic.
+
+    If no possible path, returns None.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        return []
+    if landmarks.distance(source, target) == -1:
+        return None
+
+    estimate = landmarks.heuristic(target)
+
+    # Map every reached person to (movie, parent, hops from the source)
+    reached = {source: (None, None, 0)}
+    frontier = [(estimate(source), 0, source)]
+    expanded = set()
+
+    while frontier:
+        _, hops, person = heapq.heappop(frontier)
+        if person == target:
+            # Create path from target back to source
+            path = []
+            while person != source:
+                movie, parent, _ = reached[person]
+                path.append((graph.movie_ids[movie], graph.person_ids[person]))
+                person = parent
+            return path[::-1]
+
+        # The heuristic is consistent, so nobody needs expanding twice
+        if person in expanded:
+            continue
+        expanded.add(person)
+
+        for movie, neighbor in neighbors_for_index(person):
+            if neighbor in reached and reached[neighbor][2] <= hops + 1:
+                continue
+            reached[neighbor] = (movie, person, hops + 1)
+            heapq.heappush(
+                frontier, (hops + 1 + estimate(neighbor), hops + 1, neighbor)
+            )
 
     # If no path was return, return None
     return None
 
 
-def person_id_for_name(name):
+def shortest_paths(pairs, workers=None, bidirectional=False):
+    """
+    Returns the shortest path for every (source, target) pair of IMDB ids,
+    in input order, running the searches on `workers` processes
+    (one per CPU by default).
+
+    Workers never receive the graph with their tasks: forked workers
+    share it copy-on-write, and spawned workers memory-map the same
+    on-disk snapshot.
+    """
+    pairs = [(source, target, bidirectional) for source, target in pairs]
+    workers = min(workers or os.cpu_count() or 1, len(pairs))
+    if workers <= 1:
+        return [path_for_pair(pair) for pair in pairs]
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context("spawn")
+        initializer, initargs = load_data, data_source
+
+    # Hand out pairs in chunks to keep the per-task overhead small
+    chunksize = max(1, len(pairs) // (workers * 4))
+    with context.Pool(workers, initializer, initargs) as pool:
+        return pool.map(path_for_pair, pairs, chunksize)
+
+
+def path_for_pair(pair):
+    """
+    Returns `shortest_path` for a (source, target, bidirectional) tuple.
+    """
+    source, target, bidirectional = pair
+    return shortest_path(source, target, bidirectional=bidirectional)
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing breadth-first
+    frontiers from both people until they meet.
+
+    If no possible path, returns None.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        return []
+
+    # Map every reached person to (movie, person, depth), where the
+    # pair is the step back towards the side's starting person
+    forward = {source: (None, None, 0)}
+    backward = {target: (None, None, 0)}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        # Expand a whole layer of the smaller frontier
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_layer(
+                forward_frontier, forward, backward
+            )
+        else:
+            backward_frontier, meeting = expand_layer(
+                backward_frontier, backward, forward
+            )
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    # One side ran out of people to explore, so they are not connected
+    return None
+
+
+def expand_layer(frontier, reached, other):
+    """
+    Expands every person in `frontier` by one step, recording new people
+    in `reached`.
+
+    Returns the next frontier and the person where the search met the
+    `other` side through the shortest connection, or None if it did not.
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    for person in frontier:
+        depth = reached[person][2] + 1
+        for movie, neighbor in neighbors_for_index(person):
+            if neighbor in reached:
+                continue
+            reached[neighbor] = (movie, person, depth)
+            next_frontier.append(neighbor)
+
+            # Keep the meeting point with the shortest total length
+            if neighbor in other:
+                length = depth + other[neighbor][2]
+                if best is None or length < best:
+                    meeting = neighbor
+                    best = length
+
+    return next_frontier, meeting
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (movie_id, person_id) path from the source to the target
+    through the person where both searches met.
+    """
+    # Walk back from the meeting person to the source
+    path = []
+    person = meeting
+    while forward[person][1] is not None:
+        movie, parent, _ = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    # Walk forward from the meeting person to the target
+    person = meeting
+    while backward[person][1] is not None:
+        movie, child, _ = backward[person]
+        path.append((movie, child))
+        person = child
+
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, one at a time.
+
+    A single breadth-first search records every (movie, parent) step
+    between consecutive layers, and the paths are then enumerated
+    lazily from that parent graph, so none of them has to be stored.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        yield []
+        return
+
+    # Search layer by layer until the layer holding the target is complete
+    depth = {source: 0}
+    parents = {}
+    layer = [source]
+    while layer and target not in depth:
+        next_layer = []
+        for person in layer:
+            for movie, neighbor in neighbors_for_index(person):
+                if neighbor not in depth:
+                    depth[neighbor] = depth[person] + 1
+                    parents[neighbor] = []
+                    next_layer.append(neighbor)
+                if depth[neighbor] == depth[person] + 1:
+                    parents[neighbor].append((movie, person))
+        layer = next_layer
+    if target not in depth:
+        return
+
+    # Walk the parent graph back from the target, depth first, where
+    # `steps` holds the (movie, person) steps into every stacked person
+    steps = []
+    stack = [(target, iter(parents[target]))]
+    while stack:
+        person, options = stack[-1]
+        step = next(options, None)
+        if step is None:
+            stack.pop()
+            if steps:
+                steps.pop()
+            continue
+        movie, parent = step
+        steps.append((movie, person))
+        if parent == source:
+            yield [(graph.movie_ids[movie], graph.person_ids[person])
+                   for movie, person in reversed(steps)]
+            steps.pop()
+        else:
+            stack.append((parent, iter(parents[parent])))
+
+
+def k_shortest_paths(source, target, k):
+    """
+    Yields up to `k` distinct lists of (movie_id, person_id) pairs that
+    connect the source to the target without visiting anyone twice,
+    shortest first.
+
+    A single breadth-first search from the target gives the exact
+    distance to it from everyone, which prunes a depth-first enumeration
+    of the paths of each length to the branches that can still finish
+    in time.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if k <= 0:
+        return
+    if source == target:
+        yield []
+        return
+
+    # Hops from everyone in the target's component to the target
+    remaining = {target: 0}
+    layer = [target]
+    while layer:
+        next_layer = []
+        for person in layer:
+            for _, neighbor in neighbors_for_index(person):
+                if neighbor not in remaining:
+                    remaining[neighbor] = remaining[person] + 1
+                    next_layer.append(neighbor)
+        layer = next_layer
+    if source not in remaining:
+        return
+
+    found = 0
+    for length in range(remaining[source], len(remaining)):
+        for path in paths_of_length(source, target, length, remaining):
+            yield [(graph.movie_ids[movie], graph.person_ids[person])
+                   for movie, person in path]
+            found += 1
+            if found == k:
+                return
+
+
+def paths_of_length(source, target, length, remaining):
+    """
+    Yields every simple path of exactly `length` (movie, person) index
+    steps from the source to the target, where `remaining` holds the
+    distance from each person to the target.
+    """
+    path = []
+    visited = {source}
+    stack = [iter(neighbors_for_index(source))]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if path:
+                visited.discard(path.pop()[1])
+            continue
+        movie, person = step
+        hops = len(path) + 1
+        if person in visited or hops + remaining.get(person, length) > length:
+            continue
+        if person == target:
+            if hops == length:
+                yield path + [step]
+            continue
+        path.append(step)
+        visited.add(person)
+        stack.append(iter(neighbors_for_index(person)))
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If `interactive` is False, ambiguous names return None instead of
+    prompting for an id.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [graph.person_ids[person]
+                  for person in graph.names.get(name.lower(), ())]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index[person_id]
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -173,18 +500,59 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_people(query, limit=10):
+    """
+    Returns up to `limit` (person_id, name, birth, score) tuples for the
+    people whose names best match `query`, best first, tolerating typos
+    and partial names. A score of 1 is an exact match.
+    """
+    return [(graph.person_ids[person], graph.person_names[person],
+             graph.person_births[person], score)
+            for score, person in get_name_index().search(query, limit)]
+
+
+def get_name_index():
+    """
+    Returns the index over the names of the loaded graph, loading it on
+    first use. Like the snapshot, it is built and saved on the first run.
+    """
+    global name_index
+    with name_index_lock:
+        if name_index is None:
+            name_index = NameIndex.for_graph(graph)
+        return name_index
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    return frozenset(
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in neighbors_for_index(graph.person_index[person_id])
+    )
+
+
+def neighbors_for_index(person):
+    """
+    Returns a frozenset of (movie, person) index pairs for people who
+    starred with a given person index, remembering the sets of recently
+    expanded people in `neighbor_cache`.
+    """
+    neighbors = neighbor_cache.get(person)
+    if neighbors is None:
+        neighbors = frozenset(graph.neighbors(person))
+        neighbor_cache.put(person, neighbors)
     return neighbors
 
 
+def neighbor_cache_info():
+    """
+    Returns the hits, misses, size and maxsize of the neighbor cache.
+    """
+    return neighbor_cache.info()
+
+
 if __name__ == "__main__":
     main()
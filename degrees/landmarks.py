@@ -0,0 +1,193 @@
+import os
+import struct
+import sys
+from array import array
+
+from store import (GraphStore, LANDMARK_MAGIC, open_framed, source_key,
+                   write_framed)
+
+INDEX_NAME = "landmarks.index"
+
+# Distances are stored in one byte: FAR means "FAR or more hops away",
+# and UNREACHABLE means the person is not connected to the landmark
+FAR = 254
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances (in people hops) from a few hub actors to
+    everyone, stored person-major as one byte each: the distances of
+    person `p` are `distances[p * k:(p + 1) * k]` for `k` landmarks.
+
+    By the triangle inequality, |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+    for every landmark L, which bounds distances without searching and
+    gives an admissible heuristic for A*.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.snapshot = None
+
+    @classmethod
+    def build(cls, graph, count=32):
+        """
+        Returns an index over the `count` people who starred in the most
+        movies of `graph`.
+        """
+        n = len(graph.person_ids)
+        offsets = graph.person_offsets
+        people = sorted(range(n), key=lambda p: offsets[p] - offsets[p + 1])
+        landmarks = array("i", people[:count])
+        k = len(landmarks)
+
+        distances = bytearray([UNREACHABLE]) * (n * k)
+        for column, landmark in enumerate(landmarks):
+            for person, distance in breadth_first_distances(graph, landmark):
+                distances[person * k + column] = min(distance, FAR)
+        return cls(landmarks, distances)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the number of hops between two
+        person indexes, where an upper bound of None means unknown and a
+        lower bound of None means they are not connected at all.
+        """
+        if source == target:
+            return 0, 0
+
+        k = len(self.landmarks)
+        distances = self.distances
+        lower = 1
+        upper = None
+        for column in range(k):
+            d_source = distances[source * k + column]
+            d_target = distances[target * k + column]
+            if d_source == UNREACHABLE or d_target == UNREACHABLE:
+                if d_source != d_target:
+                    # Only one of them is connected to this landmark
+                    return None, None
+                continue
+            if d_source < FAR and d_target < FAR:
+                lower = max(lower, abs(d_source - d_target))
+                if upper is None or d_source + d_target < upper:
+                    upper = d_source + d_target
+        return lower, upper
+
+    def distance(self, source, target):
+        """
+        Returns the number of hops between two person indexes when the
+        landmarks pin it down exactly, -1 if they are not connected, and
+        None if only a search can tell.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None:
+            return -1
+        return lower if lower == upper else None
+
+    def heuristic(self, target):
+        """
+        Returns a function estimating the hops from a person index to
+        `target` without ever overestimating them.
+        """
+        k = len(self.landmarks)
+        distances = self.distances
+        goal = [distances[target * k + column] for column in range(k)]
+        usable = [column for column in range(k) if goal[column] < FAR]
+
+        def estimate(person):
+            best = 0
+            base = person * k
+            for column in usable:
+                d = distances[base + column]
+                if d < FAR:
+                    d -= goal[column]
+                    if d < 0:
+                        d = -d
+                    if d > best:
+                        best = d
+            return best
+
+        return estimate
+
+    def save(self, path, key):
+        """
+        Write the index to `path`, tagged with the `key` of the CSV files
+        of the graph it was built from.
+        """
+        header = {
+            "key": key,
+            "count": len(self.landmarks),
+        }
+        landmarks = struct.pack(f"<{len(self.landmarks)}i", *self.landmarks)
+        write_framed(path, LANDMARK_MAGIC, header,
+                     [landmarks, self.distances], align=4)
+
+    @classmethod
+    def load(cls, path, key):
+        """
+        Returns the index memory-mapped from `path`, or None if there is
+        no index or it was built for another version or `key`.
+        """
+        framed = open_framed(path, LANDMARK_MAGIC, key=key)
+        if framed is None:
+            return None
+        snapshot, header, start = framed
+
+        count = header["count"]
+        landmarks = array("i", struct.unpack(
+            f"<{count}i", snapshot[start:start + 4 * count]
+        ))
+        index = cls(landmarks, memoryview(snapshot)[start + 4 * count:])
+        index.snapshot = snapshot
+        return index
+
+
+def breadth_first_distances(graph, source):
+    """
+    Yields (person, hops) for every person index reachable from `source`,
+    in breadth-first order.
+    """
+    seen = bytearray(len(graph.person_ids))
+    seen[source] = 1
+    frontier = [source]
+    distance = 0
+    while frontier:
+        for person in frontier:
+            yield person, distance
+        distance += 1
+        next_frontier = []
+        for person in frontier:
+            for _, neighbor in graph.neighbors(person):
+                if not seen[neighbor]:
+                    seen[neighbor] = 1
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+
+
+def load_index(directory):
+    """
+    Returns the landmark index built for the CSV files in `directory`,
+    or None if it has not been built or the files changed since.
+    """
+    return LandmarkIndex.load(os.path.join(directory, INDEX_NAME),
+                              source_key(directory))
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python landmarks.py directory [count]")
+    directory = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) == 3 else 32
+
+    print("Loading data...")
+    graph = GraphStore.load(directory)
+    print(f"Building index over {count} landmarks...")
+    index = LandmarkIndex.build(graph, count)
+    index.save(os.path.join(directory, INDEX_NAME), source_key(directory))
+    print(f"Index written to {os.path.join(directory, INDEX_NAME)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import heapq
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from store import NAME_INDEX_MAGIC, open_framed, write_framed
+
+
+class NameIndex():
+    """
+    Typo-tolerant index over a sequence of names.
+
+    Names are normalized (see `normalize`) and indexed two ways: their
+    positions sorted by normalized name answer prefix queries by binary
+    search, and a trigram index (one posting list of positions per
+    trigram, stored as CSR arrays) finds names sharing most trigrams
+    with a query even when it has typos. The number of distinct trigrams
+    of every name is kept too, so that matches are scored without
+    normalizing their names again.
+    """
+
+    def __init__(self, names, order, grams, offsets, postings, gram_counts):
+        self.names = names
+        self.order = order
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+        self.gram_counts = gram_counts
+        self.snapshot = None
+
+    @classmethod
+    def build(cls, names):
+        """Returns an index over the sequence `names`."""
+        normalized = [normalize(name) for name in names]
+        order = array("i", sorted(range(len(normalized)),
+                                  key=normalized.__getitem__))
+
+        lists = {}
+        gram_counts = array("H")
+        for position, name in enumerate(normalized):
+            name_grams = trigrams(name)
+            gram_counts.append(min(len(name_grams), 0xFFFF))
+            for gram in name_grams:
+                lists.setdefault(gram, array("i")).append(position)
+
+        grams = {}
+        offsets = array("q", [0])
+        postings = array("i")
+        for slot, gram in enumerate(sorted(lists)):
+            grams[gram] = slot
+            postings.extend(lists[gram])
+            offsets.append(len(postings))
+        return cls(names, order, grams, offsets, postings, gram_counts)
+
+    @classmethod
+    def for_graph(cls, graph):
+        """
+        Returns the index over the names of `graph`, memory-mapped from
+        beside the graph's snapshot when it was built for the same data,
+        and built (and saved there) otherwise.
+        """
+        path = getattr(graph, "path", None)
+        if path is None:
+            return cls.build(graph.person_names)
+
+        path = os.path.splitext(path)[0] + ".names"
+        index = cls.load(path, graph.person_names, graph.key)
+        if index is None:
+            index = cls.build(graph.person_names)
+            try:
+                index.save(path, graph.key)
+            except OSError:
+                pass
+        return index
+
+    def search(self, query, limit=10, typos=1):
+        """
+        Returns up to `limit` (score, position) pairs for the names that
+        best match `query`, best first, where a score of 1 is an exact
+        match. Names starting with the query rank high, and names up to
+        `typos` typos away from it are found through shared trigrams.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+
+        # Names starting with the query, by binary search
+        for position in self.prefix(query, limit):
+            name = normalize(self.names[position])
+            if name == query:
+                scores[position] = 1.0
+            else:
+                scores[position] = 0.5 + 0.5 * len(query) / len(name)
+
+        # Each typo breaks at most three trigrams, so names sharing fewer
+        # than `least` with the query are more than `typos` typos away.
+        # A query with no more trigrams than that could be a few typos
+        # away from any name, so it is answered by its prefixes alone
+        query_grams = trigrams(query)
+        size = len(query_grams)
+        least = size - 3 * typos
+        if least <= 0:
+            return self.ranked(scores, limit)
+
+        # A name sharing `shared` trigrams has at least that many, so it
+        # scores at most `bound(shared)`; with `limit` prefix matches
+        # already, names that cannot beat the worst of them are skipped
+        def bound(shared):
+            return 2 * shared / (size + shared) * 0.99
+
+        if len(scores) == limit:
+            worst = min(scores.values())
+            while least <= size and bound(least) <= worst:
+                least += 1
+            if least > size:
+                return self.ranked(scores, limit)
+
+        # A name sharing `least` trigrams misses at most `size - least`,
+        # so it has one of any `size - least + 1` of them: candidates are
+        # collected from the rarest, then looked up in the other (sorted)
+        # posting lists, dropping those too short of `least` to make it
+        ranges = sorted((self.posting_range(gram) for gram in query_grams),
+                        key=lambda bounds: bounds[1] - bounds[0])
+        rarest = size - least + 1
+        hits = Counter()
+        for low, high in ranges[:rarest]:
+            hits.update(self.postings[low:high])
+        remaining = size - rarest
+        for low, high in ranges[rarest:]:
+            remaining -= 1
+            for position in list(hits):
+                found = bisect_left(self.postings, position, low, high)
+                if found < high and self.postings[found] == position:
+                    hits[position] += 1
+                elif hits[position] + remaining < least:
+                    del hits[position]
+
+        # Score candidates by the Dice similarity of their trigrams
+        matches = heapq.nlargest(limit, (
+            (2 * shared / (size + self.gram_counts[position]) * 0.99,
+             position)
+            for position, shared in hits.items()
+            if shared >= least and position not in scores
+        ))
+        for score, position in matches:
+            scores[position] = score
+        return self.ranked(scores, limit)
+
+    def ranked(self, scores, limit):
+        """
+        Returns the `limit` best (score, position) pairs of the dictionary
+        `scores` from positions to scores, best first.
+        """
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        return [(score, position) for position, score in ranked[:limit]]
+
+    def posting_range(self, gram):
+        """
+        Returns the (start, end) range of `postings` listing the names
+        with the trigram `gram`, empty if there are none.
+        """
+        slot = self.grams.get(gram)
+        if slot is None:
+            return 0, 0
+        return self.offsets[slot], self.offsets[slot + 1]
+
+    def prefix(self, query, limit=10):
+        """
+        Returns up to `limit` positions of names starting with the
+        (normalized) `query`, in alphabetical order.
+        """
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if normalize(self.names[self.order[middle]]) < query:
+                low = middle + 1
+            else:
+                high = middle
+
+        positions = []
+        while low < len(self.order) and len(positions) < limit:
+            position = self.order[low]
+            if not normalize(self.names[position]).startswith(query):
+                break
+            positions.append(position)
+            low += 1
+        return positions
+
+    def save(self, path, key):
+        """
+        Write the index to `path`, tagged with the `key` of the data
+        it was built from. The names themselves are not saved.
+        """
+        header = {
+            "key": key,
+            "grams": sorted(self.grams, key=self.grams.get),
+            "sizes": [len(self.order), len(self.offsets), len(self.postings)],
+        }
+        write_framed(path, NAME_INDEX_MAGIC, header, [
+            array("i", self.order).tobytes(),
+            b"\0" * (-4 * len(self.order) % 8),
+            array("q", self.offsets).tobytes(),
+            array("i", self.postings).tobytes(),
+            array("H", self.gram_counts).tobytes(),
+        ])
+
+    @classmethod
+    def load(cls, path, names, key):
+        """
+        Returns the index over `names` memory-mapped from `path`, or None
+        if there is no index or it was built for another version or `key`.
+        """
+        framed = open_framed(path, NAME_INDEX_MAGIC, key=key)
+        if framed is None:
+            return None
+        snapshot, header, start = framed
+
+        orders, offsets, postings = header["sizes"]
+        view = memoryview(snapshot)
+        order = view[start:start + 4 * orders].cast("i")
+        start += 4 * orders + (-4 * orders % 8)
+        offset_view = view[start:start + 8 * offsets].cast("q")
+        start += 8 * offsets
+        posting_view = view[start:start + 4 * postings].cast("i")
+        start += 4 * postings
+        count_view = view[start:start + 2 * orders].cast("H")
+
+        grams = {gram: slot for slot, gram in enumerate(header["grams"])}
+        index = cls(names, order, grams, offset_view, posting_view,
+                    count_view)
+        index.snapshot = snapshot
+        return index
+
+
+def normalize(name):
+    """Returns `name` lowercased, with runs of whitespace collapsed."""
+    return " ".join(name.lower().split())
+
+
+def trigrams(name):
+    """Returns the set of trigrams of a normalized name, padded at its ends."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,288 @@
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+
+def resolve_person(value, fuzzy=False):
+    """
+    Returns the IMDB id for `value`, which is either an IMDB id or a name.
+
+    If `fuzzy` is True, a name nobody has exactly resolves to the best
+    match tolerating typos and partial names.
+
+    Raises LookupError if nobody matches, or if the name is ambiguous.
+    """
+    graph = degrees.graph
+    if value in graph.person_index:
+        return value
+    people = graph.names.get(value.lower(), ())
+    if len(people) == 0:
+        matches = degrees.search_people(value, limit=5)
+        if fuzzy and matches:
+            return matches[0][0]
+        suggestions = "; ".join(
+            f"{name} ({person_id}, born {birth})"
+            for person_id, name, birth, _ in matches
+        )
+        if suggestions:
+            raise LookupError(
+                f"person not found: {value}, did you mean: {suggestions}"
+            )
+        raise LookupError(f"person not found: {value}")
+    if len(people) > 1:
+        candidates = ", ".join(
+            f"{graph.person_ids[person]} (born {graph.person_births[person]})"
+            for person in people
+        )
+        raise LookupError(f"ambiguous name '{value}': {candidates}")
+    return graph.person_ids[people[0]]
+
+
+def answer(query):
+    """
+    Answers a query of the form {"source": ..., "target": ...}, where each
+    person is an IMDB id or a name, "fuzzy" optionally lets names resolve
+    to their best typo-tolerant match, and "bidirectional" optionally
+    picks the search strategy (the bidirectional search by default).
+    With {"distance": true}, only the degrees are answered, from the
+    landmark index when it can tell them without searching.
+
+    Returns a JSON-serializable dictionary with the path, or an "error".
+    """
+    try:
+        fuzzy = bool(query.get("fuzzy", False))
+        source = resolve_person(str(query["source"]), fuzzy)
+        target = resolve_person(str(query["target"]), fuzzy)
+    except KeyError as e:
+        return {"error": f"missing field: {e.args[0]}"}
+    except LookupError as e:
+        return {"error": str(e)}
+
+    if query.get("distance"):
+        return {"source": source, "target": target,
+                "degrees": degrees.distance(source, target)}
+
+    path = degrees.shortest_path(
+        source, target, bidirectional=bool(query.get("bidirectional", True))
+    )
+    result = {"source": source, "target": target}
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = describe_path(path)
+    return result
+
+
+def answer_paths(query):
+    """
+    Yields one answer per path for a query asking for every shortest
+    path ({"all": true}) or for the `k` shortest ones ({"k": k}) between
+    its "source" and "target", as soon as each path is found.
+
+    Yields a single answer with an "error" if the query is invalid.
+    """
+    try:
+        fuzzy = bool(query.get("fuzzy", False))
+        source = resolve_person(str(query["source"]), fuzzy)
+        target = resolve_person(str(query["target"]), fuzzy)
+        k = int(query["k"]) if "k" in query else None
+    except KeyError as e:
+        yield {"error": f"missing field: {e.args[0]}"}
+        return
+    except LookupError as e:
+        yield {"error": str(e)}
+        return
+    except (TypeError, ValueError):
+        yield {"error": "k must be an integer"}
+        return
+
+    if k is None:
+        paths = degrees.all_shortest_paths(source, target)
+    else:
+        paths = degrees.k_shortest_paths(source, target, k)
+    for path in paths:
+        yield {
+            "source": source,
+            "target": target,
+            "degrees": len(path),
+            "path": describe_path(path),
+        }
+
+
+def answers(query):
+    """
+    Yields the answers to a query, one per path when it asks for several.
+    """
+    if query.get("all") or "k" in query:
+        yield from answer_paths(query)
+    else:
+        yield answer(query)
+
+
+def describe_path(path):
+    """
+    Returns a list of dictionaries naming each (movie_id, person_id) step.
+    """
+    graph = degrees.graph
+    return [
+        {
+            "movie_id": movie_id,
+            "movie": graph.movie_titles[graph.movie_index[movie_id]],
+            "person_id": person_id,
+            "person": graph.person_names[graph.person_index[person_id]],
+        }
+        for movie_id, person_id in path
+    ]
+
+
+def run_batch(lines, output):
+    """
+    Answers one JSON query per line of `lines`, writing one JSON answer
+    per line to `output` as soon as it is ready.
+
+    Queries asking for every shortest path ("all") or the "k" shortest
+    ones get one line per path, streamed as the paths are found. A query
+    that fails gets an "error" line, and the following ones are answered.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            query = json.loads(line)
+        except ValueError:
+            result = {"error": "invalid JSON"}
+        else:
+            if isinstance(query, list) and len(query) == 2:
+                query = {"source": query[0], "target": query[1]}
+            if not isinstance(query, dict):
+                result = {
+                    "error": "query must be an object or a [source, target] pair"
+                }
+            else:
+                try:
+                    for result in answers(query):
+                        output.write(json.dumps(result) + "\n")
+                        output.flush()
+                    continue
+                except Exception as e:
+                    # One bad query must not end the stream
+                    result = {"error": f"query failed: {e!r}"}
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET /?source=...&target=... and POST / with a JSON query
+    (or a JSON list of queries) against the graph held in memory.
+
+    Queries asking for several paths are answered with a list of them.
+    """
+
+    def do_GET(self):
+        fields = parse_qs(urlparse(self.path).query)
+        query = {name: values[0] for name, values in fields.items()}
+        for flag in ("bidirectional", "all", "fuzzy", "distance"):
+            if flag in query:
+                query[flag] = query[flag].lower() not in ("0", "false", "no")
+        self.reply(self.answer(query))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            query = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.reply({"error": "invalid JSON"}, status=400)
+            return
+        if isinstance(query, list):
+            self.reply([self.answer(item) for item in query])
+        elif isinstance(query, dict):
+            self.reply(self.answer(query))
+        else:
+            self.reply({"error": "query must be an object or a list"},
+                       status=400)
+
+    def answer(self, query):
+        if not isinstance(query, dict):
+            return {"error": "query must be an object"}
+        try:
+            if query.get("all") or "k" in query:
+                return list(answer_paths(query))
+            return answer(query)
+        except Exception as e:
+            # Reply with the error rather than dropping the connection
+            return {"error": f"query failed: {e!r}"}
+
+    def reply(self, result, status=200):
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep stderr quiet, thousands of queries an hour would flood it
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """
+    Serves queries over HTTP on `host`:`port` until interrupted,
+    keeping the loaded graph in memory between requests.
+    """
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving on http://{host}:{server.server_address[1]}/",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees queries against one loaded graph."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--min-year", type=int,
+                        help="only keep movies released from this year on")
+    parser.add_argument("--max-year", type=int,
+                        help="only keep movies released up to this year")
+    parser.add_argument("--min-cast", type=int,
+                        help="only keep movies with at least this many stars")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE", nargs="?", const="-",
+                      help="read JSON line queries from FILE (default stdin)")
+    mode.add_argument("--port", type=int,
+                      help="serve queries over HTTP on this local port")
+    args = parser.parse_args()
+
+    # Load data from files into memory once for every query
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, args.min_year, args.max_year,
+                      args.min_cast)
+    # Queries may name people, so their index is loaded up front too
+    degrees.get_name_index()
+    print("Data loaded.", file=sys.stderr)
+
+    if args.port is not None:
+        serve(args.port)
+    elif args.batch in (None, "-"):
+        run_batch(sys.stdin, sys.stdout)
+    else:
+        with open(args.batch, encoding="utf-8") as f:
+            run_batch(f, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import json
+import random
+import sys
+from array import array
+from collections import Counter
+
+from store import GraphStore
+
+# Number of breadth-first searches run at once, one bit of a bitset each
+BATCH_WIDTH = 64
+
+
+def components(graph):
+    """
+    Returns an array mapping every person index to the smallest person
+    index of their connected component (people linked by shared movies).
+    """
+    parent = array("i", range(len(graph.person_ids)))
+
+    def find(person):
+        root = person
+        while parent[root] != root:
+            root = parent[root]
+        # Point the whole chain at the root, so later finds are short
+        while parent[person] != root:
+            parent[person], person = root, parent[person]
+        return root
+
+    for movie in range(len(graph.movie_ids)):
+        stars = graph.stars_for_movie(movie)
+        if len(stars) < 2:
+            continue
+        first = find(stars[0])
+        for star in stars[1:]:
+            other = find(star)
+            if other != first:
+                if other < first:
+                    first, other = other, first
+                parent[other] = first
+
+    for person in range(len(parent)):
+        parent[person] = find(person)
+    return parent
+
+
+def summarize(values):
+    """
+    Returns the count, min, max, mean and some percentiles of `values`,
+    along with a histogram of them.
+    """
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def percentile(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    return {
+        "count": len(values),
+        "min": values[0],
+        "max": values[-1],
+        "mean": sum(values) / len(values),
+        "median": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "histogram": {str(value): count
+                      for value, count in sorted(Counter(values).items())},
+    }
+
+
+def costar_degrees(graph):
+    """
+    Yields the number of distinct co-stars of every person, in order.
+    """
+    for person in range(len(graph.person_ids)):
+        costars = set()
+        for movie in graph.movies_for_person(person):
+            costars.update(graph.stars_for_movie(movie))
+        costars.discard(person)
+        yield len(costars)
+
+
+def multi_source_bfs(graph, sources):
+    """
+    Runs one breadth-first search from each of `sources` at once, moving
+    every frontier through shared movies with bitwise operations.
+
+    Returns (eccentricities, distances): the number of hops to the
+    farthest person reached from each source, and a Counter of how many
+    (source, person) pairs are each number of hops apart.
+    """
+    n = len(graph.person_ids)
+    seen = [0] * n
+    frontier = {}
+    for bit, source in enumerate(sources):
+        seen[source] |= 1 << bit
+        frontier[source] = frontier.get(source, 0) | 1 << bit
+
+    eccentricities = [0] * len(sources)
+    distances = Counter()
+    hops = 0
+    while frontier:
+        hops += 1
+
+        # Push every frontier onto the movies of its people...
+        movies = {}
+        for person, bits in frontier.items():
+            for movie in graph.movies_for_person(person):
+                movies[movie] = movies.get(movie, 0) | bits
+
+        # ...and from the movies onto their stars not reached before
+        reached = {}
+        for movie, bits in movies.items():
+            for star in graph.stars_for_movie(movie):
+                new = bits & ~seen[star]
+                if new:
+                    reached[star] = reached.get(star, 0) | new
+        level = 0
+        for star, bits in reached.items():
+            seen[star] |= bits
+            level |= bits
+            distances[hops] += bin(bits).count("1")
+
+        # Every search still growing reaches farther
+        bit = 0
+        while level:
+            if level & 1:
+                eccentricities[bit] = hops
+            level >>= 1
+            bit += 1
+        frontier = reached
+
+    return eccentricities, distances
+
+
+def report(graph, samples=64, seed=0):
+    """
+    Returns a JSON-serializable report of the components, degree
+    distributions and a sampled eccentricity and diameter estimate
+    of `graph`.
+    """
+    roots = components(graph)
+    sizes = Counter(roots)
+    largest, largest_size = (sizes.most_common(1) or [(None, 0)])[0]
+
+    # Sample sources from the largest component, where paths are long
+    members = [person for person in range(len(roots))
+               if roots[person] == largest]
+    rng = random.Random(seed)
+    sources = rng.sample(members, min(samples, len(members)))
+    eccentricities = []
+    distances = Counter()
+    for start in range(0, len(sources), BATCH_WIDTH):
+        batch = sources[start:start + BATCH_WIDTH]
+        batch_eccentricities, batch_distances = multi_source_bfs(graph, batch)
+        eccentricities.extend(batch_eccentricities)
+        distances.update(batch_distances)
+
+    return {
+        "people": len(graph.person_ids),
+        "movies": len(graph.movie_ids),
+        "stars": len(graph.movie_stars),
+        "components": {
+            "count": len(sizes),
+            "largest": largest_size,
+            "isolated_people": sum(
+                1 for person in range(len(graph.person_ids))
+                if graph.person_offsets[person] == graph.person_offsets[person + 1]
+            ),
+            "sizes": summarize(sizes.values()),
+        },
+        "movies_per_person": summarize(
+            graph.person_offsets[p + 1] - graph.person_offsets[p]
+            for p in range(len(graph.person_ids))
+        ),
+        "stars_per_movie": summarize(
+            graph.movie_offsets[m + 1] - graph.movie_offsets[m]
+            for m in range(len(graph.movie_ids))
+        ),
+        "costars_per_person": summarize(costar_degrees(graph)),
+        "eccentricity": {
+            "samples": len(sources),
+            "seed": seed,
+            **summarize(eccentricities),
+        },
+        "diameter_lower_bound": max(eccentricities, default=0),
+        "distances": {str(hops): count
+                      for hops, count in sorted(distances.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report statistics of a degrees dataset as JSON."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--samples", type=int, default=64,
+                        help="number of people to measure eccentricity from")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for sampling those people")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the report to FILE instead of stdout")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = GraphStore.load(args.directory)
+    print("Computing statistics...", file=sys.stderr)
+    result = json.dumps(report(graph, args.samples, args.seed), indent=4)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
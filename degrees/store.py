@@ -0,0 +1,628 @@
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import defaultdict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
+from operator import itemgetter
+
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_NAME = "degrees.snapshot"
+
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+class GraphStore():
+    """
+    Compact store of the degrees data.
+
+    People and movies are interned to dense integer indexes, and the
+    bipartite person <-> movie adjacency is kept as two CSR arrays: the
+    movies of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self):
+        # Index -> IMDB id, name and birth year of every person
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+
+        # Index -> IMDB id, title and year of every movie
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # IMDB id -> index
+        self.person_index = {}
+        self.movie_index = {}
+
+        # Lowercase name -> tuple of person indexes
+        self.names = {}
+
+        # CSR adjacency in both directions
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+        # Snapshot path and source key, when loaded through `load`
+        self.path = None
+        self.key = None
+
+    @classmethod
+    def load(cls, directory, min_year=None, max_year=None, min_cast=None):
+        """
+        Returns the store for the CSV files in `directory`, memory-mapping
+        its binary snapshot when it is up to date with the CSV files, and
+        parsing the CSV files (and writing a new snapshot) otherwise.
+
+        Filtered views (see `from_csv`) get a snapshot of their own.
+        """
+        filters = {"min_year": min_year, "max_year": max_year,
+                   "min_cast": min_cast}
+        path = os.path.join(directory, snapshot_name(filters))
+        key = source_key(directory) + [filters]
+        store = cls.open_snapshot(path, key)
+        if store is None:
+            store = cls.from_csv(directory, **filters)
+            try:
+                store.write_snapshot(path, key)
+            except OSError:
+                # Keep working from memory if the directory is read-only
+                pass
+            else:
+                store = cls.open_snapshot(path, key) or store
+
+        # Let indexes over this store be cached beside its snapshot
+        store.path = path
+        store.key = key
+        return store
+
+    @classmethod
+    def from_csv(cls, directory, min_year=None, max_year=None, min_cast=None):
+        """
+        Load data from the CSV files in `directory` into a new store.
+
+        Only movies released from `min_year` to `max_year` with at least
+        `min_cast` known stars are kept, and when any of these filters is
+        given, only the people starring in those movies.
+
+        The files are streamed in chunks, and rows outside the filters
+        are dropped as they are read: movies first, since theirs is the
+        smallest file, then the stars of the movies kept, then the people
+        starring in those.
+        """
+        filtered = any(value is not None
+                       for value in (min_year, max_year, min_cast))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Without filters everyone is kept, so people can be read
+            # on another thread meanwhile
+            if not filtered:
+                people = executor.submit(read_people, directory)
+            movie_ids, movie_titles, movie_years = read_movies(
+                directory, min_year, max_year
+            )
+            movie_index = {id: i for i, id in enumerate(movie_ids)}
+            star_people, edge_people, edge_movies = read_stars(directory,
+                                                               movie_index)
+            if filtered:
+                people = executor.submit(read_people, directory,
+                                         set(star_people))
+            person_ids, person_names, person_births = people.result()
+
+        store = cls()
+        store.person_ids = person_ids
+        store.person_names = person_names
+        store.person_births = person_births
+        store.movie_ids = movie_ids
+        store.movie_titles = movie_titles
+        store.movie_years = movie_years
+        store.person_index = {id: i for i, id in enumerate(person_ids)}
+        store.movie_index = movie_index
+
+        # Translate the person ids the stars file was interned with,
+        # dropping edges to people missing from the people file
+        person_map = array("i", (store.person_index.get(id, -1)
+                                 for id in star_people))
+        del star_people
+        kept_people = array("i")
+        kept_movies = array("i")
+        for person, movie in zip(edge_people, edge_movies):
+            person = person_map[person]
+            if person >= 0:
+                kept_people.append(person)
+                kept_movies.append(movie)
+        del edge_people, edge_movies
+
+        store.build(kept_people, kept_movies)
+        if min_cast is not None:
+            store.drop_small_casts(min_cast)
+        return store
+
+    def build(self, edge_people, edge_movies):
+        """
+        Build the CSR adjacency and the name index from parallel arrays
+        of (person, movie) edges.
+        """
+        self.person_offsets, self.person_movies = build_csr(
+            edge_people, edge_movies, len(self.person_ids)
+        )
+        self.movie_offsets, self.movie_stars = build_csr(
+            edge_movies, edge_people, len(self.movie_ids)
+        )
+
+        names = {}
+        for person, name in enumerate(self.person_names):
+            names.setdefault(name.lower(), []).append(person)
+        self.names = {name: tuple(people) for name, people in names.items()}
+
+    def drop_small_casts(self, min_cast):
+        """
+        Rebuild the store without movies with fewer than `min_cast` stars,
+        and without the people who only starred in those.
+        """
+        movie_offsets = self.movie_offsets
+        keep_movie = [movie_offsets[m + 1] - movie_offsets[m] >= min_cast
+                      for m in range(len(self.movie_ids))]
+
+        # Number the surviving movies and people densely again
+        movie_map = array("i", [-1]) * len(self.movie_ids)
+        person_map = array("i", [-1]) * len(self.person_ids)
+        edge_people = array("i")
+        edge_movies = array("i")
+        movies = 0
+        for movie, keep in enumerate(keep_movie):
+            if not keep:
+                continue
+            movie_map[movie] = movies
+            movies += 1
+            for star in self.stars_for_movie(movie):
+                person_map[star] = 0
+        people = 0
+        for person in range(len(self.person_ids)):
+            if person_map[person] == 0:
+                person_map[person] = people
+                people += 1
+        for movie, keep in enumerate(keep_movie):
+            if keep:
+                for star in self.stars_for_movie(movie):
+                    edge_people.append(person_map[star])
+                    edge_movies.append(movie_map[movie])
+
+        for name in ("person_ids", "person_names", "person_births"):
+            values = getattr(self, name)
+            setattr(self, name, [values[person]
+                                 for person in range(len(values))
+                                 if person_map[person] >= 0])
+        for name in ("movie_ids", "movie_titles", "movie_years"):
+            values = getattr(self, name)
+            setattr(self, name, [values[movie]
+                                 for movie in range(len(values))
+                                 if keep_movie[movie]])
+        self.person_index = {id: i for i, id in enumerate(self.person_ids)}
+        self.movie_index = {id: i for i, id in enumerate(self.movie_ids)}
+        self.build(edge_people, edge_movies)
+
+    def write_snapshot(self, path, key):
+        """
+        Write the store to a binary snapshot at `path`, tagged with the
+        `key` of the CSV files it was parsed from.
+        """
+        sections = {
+            "person_offsets": self.person_offsets,
+            "person_movies": self.person_movies,
+            "movie_offsets": self.movie_offsets,
+            "movie_stars": self.movie_stars,
+            "person_id_order": sorted_order(self.person_ids),
+            "movie_id_order": sorted_order(self.movie_ids),
+            "name_order": sorted_order(self.person_names, key=str.lower),
+        }
+        for name in STRING_SECTIONS:
+            offsets, blob = encode_strings(getattr(self, name))
+            sections[f"{name}.offsets"] = offsets
+            sections[f"{name}.blob"] = blob
+
+        # Lay every section out on an 8-byte boundary after the header
+        layout = {}
+        position = 0
+        for name, data in sections.items():
+            size = len(data) * getattr(data, "itemsize", 1)
+            typecode = getattr(data, "typecode", "B")
+            layout[name] = [position, size, typecode]
+            position += size + (-size % 8)
+
+        header = {
+            "byteorder": sys.byteorder,
+            "key": key,
+            "sections": layout,
+        }
+        chunks = []
+        for name, data in sections.items():
+            size = layout[name][1]
+            chunks.append(data if isinstance(data, bytes) else data.tobytes())
+            chunks.append(b"\0" * (-size % 8))
+        write_framed(path, SNAPSHOT_MAGIC, header, chunks)
+
+    @classmethod
+    def open_snapshot(cls, path, key):
+        """
+        Returns a store memory-mapped from the snapshot at `path`, or None
+        if there is no snapshot or it does not match this version or `key`.
+        """
+        # Check the snapshot was written by this layout from these files
+        framed = open_framed(path, SNAPSHOT_MAGIC, byteorder=sys.byteorder,
+                             key=key)
+        if framed is None:
+            return None
+        snapshot, header, start = framed
+
+        # Expose every section as a zero-copy view into the mapping
+        view = memoryview(snapshot)
+        sections = {}
+        for name, (position, size, typecode) in header["sections"].items():
+            data = view[start + position:start + position + size]
+            sections[name] = data.cast(typecode) if typecode != "B" else data
+
+        store = cls()
+        store.snapshot = snapshot
+        store.person_offsets = sections["person_offsets"]
+        store.person_movies = sections["person_movies"]
+        store.movie_offsets = sections["movie_offsets"]
+        store.movie_stars = sections["movie_stars"]
+        for name in STRING_SECTIONS:
+            setattr(store, name, StringTable(sections[f"{name}.offsets"],
+                                             sections[f"{name}.blob"]))
+        store.person_index = TableIndex(store.person_ids,
+                                        sections["person_id_order"])
+        store.movie_index = TableIndex(store.movie_ids,
+                                       sections["movie_id_order"])
+        store.names = TableIndex(store.person_names, sections["name_order"],
+                                 key=str.lower, unique=False)
+        return store
+
+    def movies_for_person(self, person):
+        """Returns the indexes of the movies a person starred in."""
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_for_movie(self, movie):
+        """Returns the indexes of the people who starred in a movie."""
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with a given person.
+        """
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(self.person_offsets[person],
+                       self.person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                if movie_stars[j] != person:
+                    yield movie, movie_stars[j]
+
+
+def build_csr(rows, columns, n):
+    """
+    Returns (offsets, targets) arrays grouping `columns` by `rows`,
+    where every row index is below `n`. Duplicate edges are dropped
+    and each row is sorted.
+    """
+    # Count edges per row and turn the counts into offsets
+    offsets = array("i", [0]) * (n + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    # Scatter every edge into its row
+    targets = array("i", [0]) * len(rows)
+    fill = offsets[:-1]
+    for row, column in zip(rows, columns):
+        targets[fill[row]] = column
+        fill[row] += 1
+
+    # Sort each row and compact away duplicate edges
+    size = 0
+    start = 0
+    for row in range(n):
+        end = offsets[row + 1]
+        previous = None
+        for column in sorted(targets[start:end]):
+            if column != previous:
+                targets[size] = column
+                size += 1
+                previous = column
+        start = end
+        offsets[row + 1] = size
+    del targets[size:]
+
+    return offsets, targets
+
+
+# String attributes of a store, saved to snapshots as string tables
+STRING_SECTIONS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings stored as one UTF-8 blob, where string
+    `i` spans `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class TableIndex():
+    """
+    Read-only mapping from the strings of a table (normalized by `key`)
+    to their positions, answered by binary search over `order`, the
+    positions of the table sorted by normalized string.
+
+    With `unique`, lookups return a single position; otherwise they
+    return a tuple of every position holding that string.
+    """
+
+    def __init__(self, table, order, key=None, unique=True):
+        self.table = table
+        self.order = order
+        self.key = key
+        self.unique = unique
+
+    def value(self, rank):
+        """Returns the normalized string at position `rank` of the order."""
+        string = self.table[self.order[rank]]
+        return self.key(string) if self.key else string
+
+    def positions(self, string):
+        """Returns a tuple of the positions holding `string`."""
+        # Find the first entry not below the string
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.value(middle) < string:
+                low = middle + 1
+            else:
+                high = middle
+
+        positions = []
+        while low < len(self.order) and self.value(low) == string:
+            positions.append(self.order[low])
+            low += 1
+        return tuple(positions)
+
+    def get(self, string, default=None):
+        positions = self.positions(string)
+        if not positions:
+            return default
+        return positions[0] if self.unique else positions
+
+    def __getitem__(self, string):
+        positions = self.positions(string)
+        if not positions:
+            raise KeyError(string)
+        return positions[0] if self.unique else positions
+
+    def __contains__(self, string):
+        return bool(self.positions(string))
+
+    def __len__(self):
+        return len(self.order)
+
+
+# Number of CSV rows parsed per chunk
+CHUNK_SIZE = 65536
+
+
+def read_chunks(path, columns):
+    """
+    Yields lists of rows of the CSV file at `path`, holding only the
+    given `columns` of each row, in chunks of up to CHUNK_SIZE rows.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = itemgetter(*(header.index(column) for column in columns))
+        while True:
+            chunk = list(map(columns, islice(reader, CHUNK_SIZE)))
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_people(directory, wanted=None):
+    """
+    Returns (ids, names, births) lists for the people in `directory`,
+    keeping only the ids in `wanted` if it is given.
+    """
+    ids, names, births = [], [], []
+    for chunk in read_chunks(f"{directory}/people.csv",
+                             ("id", "name", "birth")):
+        for id, name, birth in chunk:
+            if wanted is None or id in wanted:
+                ids.append(id)
+                names.append(name)
+                births.append(birth)
+    return ids, names, births
+
+
+def read_movies(directory, min_year=None, max_year=None):
+    """
+    Returns (ids, titles, years) lists for the movies in `directory`
+    released from `min_year` to `max_year`.
+    """
+    ids, titles, years = [], [], []
+    for chunk in read_chunks(f"{directory}/movies.csv",
+                             ("id", "title", "year")):
+        for id, title, year in chunk:
+            if min_year is not None or max_year is not None:
+                try:
+                    number = int(year)
+                except ValueError:
+                    continue
+                if ((min_year is not None and number < min_year)
+                        or (max_year is not None and number > max_year)):
+                    continue
+            ids.append(id)
+            titles.append(title)
+            years.append(year)
+    return ids, titles, years
+
+
+def read_stars(directory, movie_index):
+    """
+    Returns the edges of the stars file in `directory` to the movies of
+    `movie_index` (a dictionary from movie id to index), dropping rows of
+    other movies as they are read and interning person ids on the fly:
+    (person_ids, edge_people, edge_movies), where edge `i` links
+    `person_ids[edge_people[i]]` and movie index `edge_movies[i]`.
+    """
+    # Unseen ids are numbered as they are first looked up
+    people = defaultdict(count().__next__)
+    edge_people = array("i")
+    edge_movies = array("i")
+    for chunk in read_chunks(f"{directory}/stars.csv",
+                             ("person_id", "movie_id")):
+        for person_id, movie_id in chunk:
+            movie = movie_index.get(movie_id)
+            if movie is not None:
+                edge_people.append(people[person_id])
+                edge_movies.append(movie)
+    return list(people), edge_people, edge_movies
+
+
+def snapshot_name(filters):
+    """
+    Returns the snapshot file name for a view of the data with the given
+    filters, where unset filters are None.
+    """
+    suffix = "".join(f"-{name}{value}"
+                     for name, value in filters.items() if value is not None)
+    return SNAPSHOT_NAME.replace(".", f"{suffix}.", 1)
+
+
+def source_key(directory):
+    """
+    Returns the (name, mtime, size) of every source CSV file, which a
+    snapshot must match to be reused.
+    """
+    key = []
+    for name in SOURCE_FILES:
+        stat = os.stat(os.path.join(directory, name))
+        key.append([name, stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+# Layout version of the files written by `write_framed`, by their magic.
+# Bump a version whenever its layout changes: `open_framed` ignores files
+# saved under another version, so they get rebuilt
+LANDMARK_MAGIC = b"LANDMARK"
+NAME_INDEX_MAGIC = b"NAMEINDX"
+FRAMED_VERSIONS = {
+    SNAPSHOT_MAGIC: 1,
+    LANDMARK_MAGIC: 1,
+    NAME_INDEX_MAGIC: 2,
+}
+
+
+def write_framed(path, magic, header, chunks, align=8):
+    """
+    Write a binary file to `path`: the 8-byte `magic`, the length and
+    JSON of the `header` dict (padded so that what follows starts on an
+    `align`-byte boundary), then every bytes-like object in `chunks`.
+    The header is tagged with the version of `magic` in FRAMED_VERSIONS.
+    """
+    header = {"version": FRAMED_VERSIONS[magic], **header}
+    header = json.dumps(header).encode("utf-8")
+    header += b" " * (-(len(magic) + 8 + len(header)) % align)
+
+    # Write to a temporary file first so readers never see half a file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(magic)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def open_framed(path, magic, **expected):
+    """
+    Returns (mapping, header, start) for a file written by `write_framed`:
+    the file memory-mapped, its header, and the offset its chunks start
+    at. Returns None if there is no such file, or it does not start with
+    `magic`, or was saved under another version of it, or its header
+    differs from any of the `expected` fields.
+    """
+    expected = {"version": FRAMED_VERSIONS[magic], **expected}
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    prefix = len(magic) + 8
+    if len(mapping) < prefix or mapping[:len(magic)] != magic:
+        return None
+    (length,) = struct.unpack("<Q", mapping[len(magic):prefix])
+    try:
+        header = json.loads(mapping[prefix:prefix + length])
+    except ValueError:
+        return None
+    if any(header.get(name) != value for name, value in expected.items()):
+        return None
+    return mapping, header, prefix + length
+
+
+def sorted_order(strings, key=None):
+    """Returns the positions of `strings` sorted by (normalized) string."""
+    if key is None:
+        return array("i", sorted(range(len(strings)),
+                                 key=strings.__getitem__))
+    return array("i", sorted(range(len(strings)),
+                             key=lambda i: key(strings[i])))
+
+
+def encode_strings(strings):
+    """Returns (offsets, blob) encoding `strings` as a string table."""
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
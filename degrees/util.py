@@ -1,3 +1,7 @@
+import threading
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -39,3 +43,108 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with hash indexes over the states
+    and (action, state) pairs it holds for constant time membership tests.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+        self.pairs = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+        pair = (node.action, node.state)
+        self.pairs[pair] = self.pairs.get(pair, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def contains_pair(self, action, state):
+        return (action, state) in self.pairs
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.pop()
+            self.forget(node)
+            return node
+
+    def pop(self):
+        return self.frontier.pop()
+
+    def forget(self, node):
+        """Drops a removed node from the membership indexes."""
+        self.states[node.state] -= 1
+        if not self.states[node.state]:
+            del self.states[node.state]
+        pair = (node.action, node.state)
+        self.pairs[pair] -= 1
+        if not self.pairs[pair]:
+            del self.pairs[pair]
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class LRUCache():
+    """
+    Mapping of at most `maxsize` entries that evicts the least recently
+    used one first, counting lookup hits and misses.
+
+    It is safe to share between threads, such as the request handlers
+    of server.py, since every operation holds a lock.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Returns the hit and miss counters along with the cache size."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,24 @@
+"""
+Propositional logic shared by the knights puzzles and the lecture
+examples in src1: sentences, several ways of checking that a knowledge
+base entails a query (see `model_check`) or proving it by resolution,
+and counting and listing the models of a knowledge base.
+"""
+
+from proplogic.checking import (BITSET_SYMBOLS, model_check,
+                                parallel_model_check, truth_table)
+from proplogic.counting import (ModelCounter, count_models, iter_models,
+                                marginals)
+from proplogic.knowledge import KnowledgeBase
+from proplogic.resolution import Resolver, format_proof, prove
+from proplogic.sat import CNF, Solver
+from proplogic.sentences import (And, Biconditional, Implication, Not, Or,
+                                 Sentence, Symbol)
+
+__all__ = [
+    "Sentence", "Symbol", "Not", "And", "Or", "Implication",
+    "Biconditional", "CNF", "Solver", "KnowledgeBase", "BITSET_SYMBOLS",
+    "truth_table", "model_check", "parallel_model_check", "ModelCounter",
+    "count_models", "iter_models", "marginals", "Resolver", "prove",
+    "format_proof",
+]
@@ -0,0 +1,334 @@
+"""
+Times every way `model_check` can answer queries, and how much memory
+each takes at its peak, on the knowledge bases of the puzzle scripts in
+this repository and on generated ones of growing size (see
+`proplogic.generators`), from the repository root:
+
+    python -m proplogic.benchmark [--suite {puzzles,generated,all}]
+        [--repeat N] [--workers N] [--timeout SECONDS] [--report FILE]
+
+The report is written as CSV or JSON, by the extension of FILE. Every
+backend's answers are checked against those of the first one to answer
+(enumeration, where feasible), and the benchmark exits with an error if
+any differ, so that
+
+    python -m proplogic.benchmark --suite puzzles --repeat 1
+
+also checks every backend, resolution included, on the puzzles.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import runpy
+import signal
+import sys
+import time
+import tracemalloc
+
+from proplogic import generators
+from proplogic.checking import BITSET_SYMBOLS, model_check
+from proplogic.counting import marginals
+from proplogic.knowledge import KnowledgeBase
+from proplogic.resolution import Resolver
+from proplogic.sentences import And, Not, Sentence, Symbol
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Puzzle scripts whose knowledge bases are benchmarked
+PUZZLES = [
+    "knights/puzzle.py",
+    "src1/harry/harry.py",
+    "src1/puzzle/puzzle.py",
+    "src1/mastermind/mastermind.py",
+    "src1/clue/clue_original.py",
+    "src1/clue/clue_simplified.py",
+    "src1/clue/clue.py",
+]
+
+# Generated knowledge bases: the function making one from a size, and
+# the sizes benchmarked, in growing order
+GENERATED = [
+    ("random 3-cnf", generators.random_cnf, [10, 20, 40, 80, 160]),
+    ("queens", generators.queens, [4, 5, 6, 8]),
+    ("pigeonhole", generators.pigeonhole, [2, 3, 4, 5, 6]),
+    ("clue", generators.clue, [3, 4, 6, 9]),
+]
+
+# Seconds a timed out measurement gets to stop before it is killed
+STOP_SECONDS = 1
+
+# Largest number of symbols whose models are enumerated one at a time
+ENUMERATE_SYMBOLS = 20
+
+BACKENDS = ["enumerate", "parallel", "bitset", "sat", "knowledge base",
+            "marginals", "resolution"]
+
+FIELDS = ["source", "knowledge", "symbols", "backend", "status", "seconds",
+          "peak_bytes"]
+
+
+def knowledge_bases(path):
+    """
+    Returns (name, knowledge) for every knowledge base a puzzle script
+    builds at module level (sentences in variables whose names start
+    with "knowledge"), without running the script's main code.
+    """
+    directory = os.path.dirname(path)
+    sys.path.insert(0, directory)
+    try:
+        names = runpy.run_path(path, run_name="puzzle")
+    finally:
+        sys.path.remove(directory)
+
+    # A script's KnowledgeBase caches what it entails, so repeated runs
+    # would time cache hits: backends get a plain And of its sentences,
+    # and the "knowledge base" one builds a fresh KnowledgeBase every run
+    bases = []
+    for name, value in sorted(names.items()):
+        if name.startswith("knowledge") and isinstance(value, Sentence):
+            if isinstance(value, KnowledgeBase):
+                value = And(*value.conjuncts)
+            bases.append((name, value))
+    return bases
+
+
+def cases(suite):
+    """
+    Yields (source, name, knowledge) for every knowledge base of `suite`,
+    those of the generated families by growing size. Puzzle scripts that
+    cannot be imported are reported and left out.
+    """
+    if suite in ("puzzles", "all"):
+        for path in PUZZLES:
+            try:
+                bases = knowledge_bases(os.path.join(ROOT, path))
+            except ImportError as e:
+                print(f"{path:<30} skipped: {e}")
+                continue
+            for name, knowledge in bases:
+                yield path, name, knowledge
+    if suite in ("generated", "all"):
+        for family, generate, sizes in GENERATED:
+            for size in sizes:
+                yield family, f"size {size}", generate(size)
+
+
+def queries_for(knowledge):
+    """
+    Returns the queries a puzzle asks of `knowledge`: whether each of its
+    symbols is true, and whether it is false.
+    """
+    symbols = [Symbol(name) for name in sorted(knowledge.symbols())]
+    return symbols + [Not(symbol) for symbol in symbols]
+
+
+def feasible(backend, knowledge, workers):
+    """Checks if `backend` can answer queries about `knowledge` quickly."""
+    count = len(knowledge.symbols())
+    if backend == "enumerate":
+        return count <= ENUMERATE_SYMBOLS
+    if backend == "parallel":
+        return workers > 1 and count <= ENUMERATE_SYMBOLS
+    if backend == "bitset":
+        return count <= BITSET_SYMBOLS
+    return True
+
+
+def answers(backend, knowledge, queries, workers):
+    """Returns the answers of `backend` to every query, in order."""
+    if backend == "knowledge base":
+        if isinstance(knowledge, And):
+            knowledge = KnowledgeBase(*knowledge.conjuncts)
+        else:
+            knowledge = KnowledgeBase(knowledge)
+        return [knowledge.entails(query) for query in queries]
+    if backend == "resolution":
+        # One prover checks whether the knowledge base is consistent
+        # once, rather than once per query
+        resolver = Resolver(knowledge)
+        return [resolver.entails(query) for query in queries]
+    if backend == "marginals":
+        # A symbol is entailed when true in every model, its negation
+        # when true in none
+        total, trues = marginals(knowledge)
+        return [trues[query.name] == total if isinstance(query, Symbol)
+                else trues[query.operand.name] == 0
+                for query in queries]
+    if backend == "parallel":
+        return [model_check(knowledge, query, workers=workers)
+                for query in queries]
+    return [model_check(knowledge, query, method=backend)
+            for query in queries]
+
+
+def measure(backend, knowledge, queries, workers, repeat):
+    """
+    Returns the fastest of `repeat` timings (in seconds) of `backend`
+    answering every query, and the answers.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = answers(backend, knowledge, queries, workers)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def measure_memory(backend, knowledge, queries, workers):
+    """
+    Returns the peak of memory allocated (in bytes) by `backend` while
+    answering every query.
+
+    Memory is traced in this process only, so that of the workers of
+    the "parallel" backend is left out.
+    """
+    tracemalloc.start()
+    try:
+        answers(backend, knowledge, queries, workers)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def send_measure(connection, backend, knowledge, queries, workers, repeat):
+    """
+    Sends the result of `measure` through `connection`, then that of
+    `measure_memory`.
+    """
+    # Exit on being terminated, so that the workers of the "parallel"
+    # backend are terminated along with this process
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    connection.send(measure(backend, knowledge, queries, workers, repeat))
+    connection.send(measure_memory(backend, knowledge, queries, workers))
+    connection.close()
+
+
+def measure_within(timeout, *args):
+    """
+    Returns (seconds, peak, answers) measured by `measure` and then
+    `measure_memory` on `args` in another process, or None if the timed
+    runs take more than `timeout` seconds.
+
+    Tracing slows allocations down several times, so the memory run is
+    kept out of the timings and gets `timeout` seconds of its own, after
+    which its peak is None.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=send_measure,
+                                      args=(sender, *args))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            return None
+        seconds, result = receiver.recv()
+        peak = receiver.recv() if receiver.poll(timeout) else None
+        return seconds, peak, result
+    finally:
+        if process.is_alive():
+            process.terminate()
+            process.join(STOP_SECONDS)
+            if process.is_alive():
+                process.kill()
+        process.join()
+        receiver.close()
+
+
+def write_report(rows, path):
+    """Writes `rows` to `path`, as JSON if it ends in .json, else CSV."""
+    with open(path, "w", newline="") as f:
+        if path.endswith(".json"):
+            f.write(json.dumps(rows, indent=4) + "\n")
+        else:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every model checking backend on the puzzles "
+                    "and on generated knowledge bases."
+    )
+    parser.add_argument("--suite", choices=["puzzles", "generated", "all"],
+                        default="all",
+                        help="knowledge bases to benchmark")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per backend, the fastest is reported")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes enumerating models in parallel")
+    parser.add_argument("--timeout", type=float, default=10,
+                        help="seconds a backend gets per knowledge base "
+                             "for its timed runs, after which it is "
+                             "stopped and skipped on larger ones of the "
+                             "same source (its memory run gets as many "
+                             "again)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write every measurement to FILE as CSV, "
+                             "or as JSON if FILE ends in .json")
+    args = parser.parse_args()
+
+    rows = []
+    timed_out = set()
+    differ = []
+    print(f"{'source':<30} {'knowledge':<11} {'symbols':>7} "
+          f"{'backend':<15} {'seconds':>9} {'peak KiB':>9}")
+    for source, name, knowledge in cases(args.suite):
+        symbols = len(knowledge.symbols())
+        queries = queries_for(knowledge)
+        expected = None
+        fastest = None
+        for backend in BACKENDS:
+            row = {"source": source, "knowledge": name, "symbols": symbols,
+                   "backend": backend, "status": "ok", "seconds": None,
+                   "peak_bytes": None}
+            line = f"{source:<30} {name:<11} {symbols:>7} {backend:<15}"
+            if ((source, backend) in timed_out
+                    or not feasible(backend, knowledge, args.workers)):
+                row["status"] = "skipped"
+                print(f"{line} {'skipped':>9}")
+                rows.append(row)
+                continue
+
+            measured = measure_within(args.timeout, backend, knowledge,
+                                      queries, args.workers, args.repeat)
+            if measured is None:
+                timed_out.add((source, backend))
+                row["status"] = "timed out"
+                print(f"{line} {'timed out':>9}", flush=True)
+                rows.append(row)
+                continue
+
+            seconds, peak, result = measured
+            if expected is None:
+                expected = result
+            if result != expected:
+                row["status"] = "answers differ"
+                differ.append(f"{backend} on {source} {name}")
+            elif fastest is None or seconds < fastest[1]:
+                fastest = (backend, seconds)
+            row["seconds"] = seconds
+            row["peak_bytes"] = peak
+            note = "" if result == expected else "  answers differ!"
+            kib = "-" if peak is None else f"{peak / 1024:.0f}"
+            print(f"{line} {seconds:>9.4f} {kib:>9}{note}", flush=True)
+            rows.append(row)
+
+        if fastest is not None:
+            print(f"{source:<30} {name:<11} {symbols:>7} "
+                  f"{'fastest':<15} {fastest[0]}")
+
+    if args.report:
+        write_report(rows, args.report)
+    if differ:
+        sys.exit("Answers differ: " + "; ".join(differ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import itertools
+import multiprocessing
+
+from proplogic.knowledge import KnowledgeBase
+from proplogic.resolution import Resolver
+from proplogic.sat import CNF, Solver
+from proplogic.sentences import Not
+
+# Largest number of symbols whose truth table is evaluated at once, one
+# bit per model: 2^25 models take 4 MiB for every intermediate result
+BITSET_SYMBOLS = 25
+
+# Number of parts the models are split into per worker when enumerated
+# in parallel, so that workers done early pick up the remaining ones
+PARTS_PER_WORKER = 4
+
+# Workers check whether another one found a counter-model every time the
+# values of this many last symbols have all been tried (4096 models)
+STOP_CHECK_SYMBOLS = 12
+
+
+def truth_table(symbols):
+    """
+    Returns (columns, mask) for evaluating sentences over every model of
+    `symbols` at once (see `Sentence.bits`): in model `j`, the `i`th
+    symbol has the value of bit `i` of `j`.
+    """
+    size = 1 << len(symbols)
+    mask = (1 << size) - 1
+    columns = {}
+    for i, name in enumerate(symbols):
+        # Half a period of zeros then half a period of ones, repeated
+        width = 2 << i
+        column = ((1 << (width >> 1)) - 1) << (width >> 1)
+        while width < size:
+            column |= column << width
+            width <<= 1
+        columns[name] = column
+    return columns, mask
+
+
+def model_check(knowledge, query, method="enumerate", workers=1):
+    """
+    Checks if knowledge base entails query, either by enumerating every
+    model ("enumerate"), by evaluating both over the whole truth table at
+    once, one bit per model ("bitset"), or by asking a SAT solver whether
+    the knowledge base and the negated query can be true together ("sat"),
+    or by deriving a contradiction from them by resolution ("resolution").
+    A KnowledgeBase answers "sat" queries from what it learned before.
+
+    With more than one worker, the models are enumerated in parallel on
+    that many processes.
+    """
+    if workers > 1 and method != "enumerate":
+        raise ValueError("only enumeration runs on several workers")
+    if method == "sat":
+        if isinstance(knowledge, KnowledgeBase):
+            return knowledge.entails(query)
+        clauses = CNF()
+        clauses.add(knowledge)
+        clauses.add(Not(query))
+        return not Solver(clauses.clauses).solve()
+    if method == "resolution":
+        return Resolver(knowledge).entails(query)
+    if method == "bitset":
+        symbols = sorted(knowledge.symbols() | query.symbols())
+        if len(symbols) > BITSET_SYMBOLS:
+            raise ValueError(
+                f"too many symbols for a truth table: {len(symbols)}"
+            )
+        columns, mask = truth_table(symbols)
+        # No model of the knowledge base may falsify the query
+        return knowledge.bits(columns, mask) & ~query.bits(columns, mask) == 0
+    if method != "enumerate":
+        raise ValueError(f"unknown model checking method: {method}")
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    if workers > 1:
+        return parallel_model_check(knowledge, query, symbols, workers)
+
+    # Compile both sentences over the same positions of a model
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # Check that the query is true in every model where knowledge is true
+    for model in itertools.product((True, False), repeat=len(symbols)):
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def parallel_model_check(knowledge, query, symbols, workers):
+    """
+    Checks if knowledge base entails query over the models of `symbols`,
+    split by the values of the first few symbols into parts enumerated
+    on `workers` processes. Every worker is stopped as soon as one finds
+    a model of the knowledge base where the query is false.
+    """
+    split = min(len(symbols), (workers * PARTS_PER_WORKER - 1).bit_length())
+    prefixes = itertools.product((True, False), repeat=split)
+
+    # Workers are stopped through an event rather than by terminating the
+    # pool, which can deadlock while parts are still being handed out
+    stop = multiprocessing.Event()
+    pool = multiprocessing.Pool(workers, start_worker,
+                                (knowledge, query, symbols, stop))
+    try:
+        entailed = all(pool.imap_unordered(check_models, prefixes))
+        pool.close()
+        pool.join()
+    except BaseException:
+        pool.terminate()
+        raise
+    return entailed
+
+
+# Compiled knowledge base and query of a model checking worker, the
+# number of symbols in a model and the event that stops the workers
+checking = None
+
+
+def start_worker(knowledge, query, symbols, stop):
+    """Compiles the sentences a worker checks (see `check_models`)."""
+    global checking
+    checking = (knowledge.compile(symbols), query.compile(symbols),
+                len(symbols), stop)
+
+
+def check_models(prefix):
+    """
+    Checks, in a worker, that the query holds in every model of the
+    knowledge base that starts with the truth values `prefix`.
+    """
+    knowledge, query, count, stop = checking
+    remaining = count - len(prefix)
+    last = min(remaining, STOP_CHECK_SYMBOLS)
+    suffixes = list(itertools.product((True, False), repeat=last))
+    for middle in itertools.product((True, False), repeat=remaining - last):
+        if stop.is_set():
+            # Another worker found a counter-model, this answer is moot
+            return True
+        start = prefix + middle
+        for suffix in suffixes:
+            model = start + suffix
+            if knowledge(model) and not query(model):
+                stop.set()
+                return False
+    return True
@@ -0,0 +1,285 @@
+import itertools
+from collections import Counter
+
+from proplogic.sat import CNF
+
+
+class ModelCounter():
+    """
+    Counts the models of CNF clauses (#SAT) by a DPLL search that, after
+    unit propagation, splits the clauses into components sharing no
+    variable, counts each component on its own and multiplies the counts.
+    The count of every component met is cached, so components that come
+    back on other branches of the search are only counted once.
+
+    With `marginals`, the same pass also counts the models where each
+    variable is true.
+
+    The search goes as deep as the number of variables it branches on,
+    so rather than recursing, each step of it is a generator that yields
+    the steps whose counts it needs and is sent their results back (see
+    `count`), keeping the pending steps on a stack of their own.
+    """
+
+    def __init__(self, marginals=False):
+        self.marginals = marginals
+        self.cache = {}
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of models of `clauses` over the set of
+        `variables` (which includes every variable of the clauses) and a
+        dictionary of the number of models where each variable is true
+        (left empty unless counting marginals, and missing variables
+        where there are no models).
+        """
+        stack = [self.counting(clauses, variables)]
+        result = None
+        while True:
+            try:
+                step = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                result = done.value
+            else:
+                stack.append(step)
+                result = None
+
+    def counting(self, clauses, variables):
+        """
+        Step returning `count` of `clauses` over `variables`, which yields
+        a `component` step for every component of the clauses.
+        """
+        clauses, assigned = propagate(clauses)
+        if clauses is None:
+            return 0, {}
+
+        components = []
+        for component in split(clauses):
+            count, trues = yield self.component(component)
+            if count == 0:
+                return 0, {}
+            components.append((count, trues))
+
+        used = set(assigned)
+        for clause in clauses:
+            used.update(abs(literal) for literal in clause)
+        free = [variable for variable in variables if variable not in used]
+
+        total = 1 << len(free)
+        for count, _ in components:
+            total *= count
+        if not self.marginals:
+            return total, {}
+
+        # Models where a variable is true: all or none of them for those
+        # propagated, half for the free ones, and those of its component
+        # times the models of every other part
+        trues = {variable: total if value else 0
+                 for variable, value in assigned.items()}
+        for variable in free:
+            trues[variable] = total >> 1
+        for count, component_trues in components:
+            scale = total // count
+            for variable, models in component_trues.items():
+                trues[variable] = models * scale
+        return total, trues
+
+    def component(self, clauses):
+        """
+        Step returning `count` for a component of clauses, at most once
+        each, which yields a `counting` step for either value of the
+        variable it branches on.
+        """
+        key = frozenset(clauses)
+        if key in self.cache:
+            return self.cache[key]
+
+        variables = {abs(literal) for clause in clauses for literal in clause}
+        occurrences = Counter(abs(literal)
+                              for clause in clauses for literal in clause)
+        variable = occurrences.most_common(1)[0][0]
+        variables.discard(variable)
+
+        true_count, true_trues = yield self.counting(
+            assign(clauses, variable), variables
+        )
+        false_count, false_trues = yield self.counting(
+            assign(clauses, -variable), variables
+        )
+        trues = {}
+        if self.marginals:
+            for other in variables:
+                trues[other] = (true_trues.get(other, 0)
+                                + false_trues.get(other, 0))
+            trues[variable] = true_count
+        self.cache[key] = (true_count + false_count, trues)
+        return self.cache[key]
+
+
+def propagate(clauses):
+    """
+    Assigns the literals of unit clauses until there are none, returning
+    the remaining clauses and a dictionary of the variables assigned,
+    or (None, None) if the clauses cannot be satisfied.
+    """
+    assigned = {}
+    while True:
+        units = set()
+        for clause in clauses:
+            if len(clause) == 1:
+                units.add(clause[0])
+            elif not clause:
+                return None, None
+        if not units:
+            return clauses, assigned
+        for unit in units:
+            if -unit in units:
+                return None, None
+            assigned[abs(unit)] = unit > 0
+
+        remaining = []
+        for clause in clauses:
+            if any(literal in units for literal in clause):
+                continue
+            clause = tuple(literal for literal in clause
+                           if -literal not in units)
+            if not clause:
+                return None, None
+            remaining.append(clause)
+        clauses = remaining
+
+
+def assign(clauses, literal):
+    """Returns `clauses` simplified by making `literal` true."""
+    return [tuple(other for other in clause if other != -literal)
+            for clause in clauses if literal not in clause]
+
+
+def split(clauses):
+    """
+    Yields the components of `clauses`: the groups of clauses linked by
+    shared variables.
+    """
+    parent = {}
+
+    def find(variable):
+        root = variable
+        while parent[root] != root:
+            root = parent[root]
+        while parent[variable] != root:
+            parent[variable], variable = root, parent[variable]
+        return root
+
+    for clause in clauses:
+        for literal in clause:
+            parent.setdefault(abs(literal), abs(literal))
+        first = find(abs(clause[0]))
+        for literal in clause[1:]:
+            other = find(abs(literal))
+            if other != first:
+                parent[other] = first
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(
+            tuple(sorted(clause))
+        )
+    yield from groups.values()
+
+
+def clauses_for(knowledge, symbols):
+    """
+    Returns the CNF of `knowledge`, with a variable for every symbol of
+    it and of `symbols`. Its models are those of the sentence, since the
+    variables of subsentences are defined by the symbols.
+    """
+    clauses = CNF()
+    for name in sorted(set(symbols)):
+        clauses.variable(name)
+    clauses.add(knowledge)
+    return clauses
+
+
+def count_models(knowledge, symbols=()):
+    """
+    Returns the number of models of the knowledge base over its symbols
+    and any other `symbols` (names).
+    """
+    clauses = clauses_for(knowledge, symbols)
+    count, _ = ModelCounter().count(
+        [tuple(clause) for clause in clauses.clauses],
+        set(range(1, clauses.count + 1))
+    )
+    return count
+
+
+def marginals(knowledge, symbols=()):
+    """
+    Returns the number of models of the knowledge base over its symbols
+    and any other `symbols` (names), and a dictionary of the number of
+    those models in which each symbol is true.
+
+    The knowledge base entails a symbol when it is true in all of its
+    models, and the symbol's negation when it is true in none.
+    """
+    clauses = clauses_for(knowledge, symbols)
+    count, trues = ModelCounter(marginals=True).count(
+        [tuple(clause) for clause in clauses.clauses],
+        set(range(1, clauses.count + 1))
+    )
+    return count, {name: trues.get(variable, 0)
+                   for name, variable in clauses.variables.items()}
+
+
+def iter_models(knowledge, symbols=()):
+    """
+    Yields every model of the knowledge base over its symbols and any
+    other `symbols` (names), as a dictionary from names to truth values.
+    """
+    clauses = clauses_for(knowledge, symbols)
+    names = clauses.names
+    for model in models([tuple(clause) for clause in clauses.clauses],
+                        set(range(1, clauses.count + 1))):
+        yield {names[variable]: value
+               for variable, value in model.items() if variable in names}
+
+
+def models(clauses, variables):
+    """
+    Yields every model of `clauses` over the set of `variables`, as a
+    dictionary from variables to truth values.
+    """
+    # Branches wait on a stack rather than in recursive calls, since the
+    # search goes as deep as the number of variables it branches on.
+    # Each holds the values chosen on the way to it, as a chain of
+    # (assigned, variable, value, parent) back to the first branch
+    stack = [(clauses, variables, None)]
+    while stack:
+        clauses, variables, chosen = stack.pop()
+        clauses, assigned = propagate(clauses)
+        if clauses is None:
+            continue
+        variables = variables - assigned.keys()
+        if not clauses:
+            free = sorted(variables)
+            for values in itertools.product((True, False), repeat=len(free)):
+                model = dict(zip(free, values))
+                model.update(assigned)
+                step = chosen
+                while step is not None:
+                    model.update(step[0])
+                    model[step[1]] = step[2]
+                    step = step[3]
+                yield model
+            continue
+
+        occurrences = Counter(abs(literal)
+                              for clause in clauses for literal in clause)
+        variable = occurrences.most_common(1)[0][0]
+        # Push the false branch first, so the true one is explored first
+        for literal in (-variable, variable):
+            stack.append((assign(clauses, literal), variables - {variable},
+                          (assigned, variable, literal > 0, chosen)))
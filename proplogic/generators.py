@@ -0,0 +1,132 @@
+"""
+Knowledge bases of any size for benchmarking: random k-CNF formulas and
+structured puzzles (n queens, the pigeonhole principle and Clue-like
+card deals).
+"""
+
+import random
+
+from proplogic.sentences import And, Implication, Not, Or, Symbol
+
+# Clauses per symbol of random formulas, just below the ratio (about
+# 4.26 for 3-CNF) where they turn from mostly satisfiable to mostly not
+CLAUSE_RATIO = 4
+
+
+def random_cnf(symbols, k=3, clauses=None, seed=0):
+    """
+    Returns a random conjunction of `clauses` (CLAUSE_RATIO times
+    `symbols` by default) disjunctions of `k` literals each, over
+    `symbols` symbols named "x0", "x1" and so on.
+    """
+    if clauses is None:
+        clauses = CLAUSE_RATIO * symbols
+    generator = random.Random(seed)
+    variables = [Symbol(f"x{i}") for i in range(symbols)]
+    disjunctions = []
+    for _ in range(clauses):
+        literals = []
+        for symbol in generator.sample(variables, k):
+            literals.append(symbol if generator.random() < 0.5
+                            else Not(symbol))
+        disjunctions.append(Or(*literals))
+    return And(*disjunctions)
+
+
+def exactly_one(symbols):
+    """Returns the sentences that exactly one of `symbols` is true."""
+    sentences = [Or(*symbols)]
+    sentences.extend(at_most_one(symbols))
+    return sentences
+
+
+def at_most_one(symbols):
+    """Returns the sentences that at most one of `symbols` is true."""
+    return [Implication(symbol1, Not(symbol2))
+            for symbol1 in symbols for symbol2 in symbols
+            if symbol1 != symbol2]
+
+
+def queens(n):
+    """
+    Returns the n queens puzzle: a queen in every row of an n by n board,
+    none attacking another, with a symbol "queen {row},{column}" per
+    square.
+    """
+    board = [[Symbol(f"queen {row},{column}") for column in range(n)]
+             for row in range(n)]
+    knowledge = And()
+    for row in board:
+        for sentence in exactly_one(row):
+            knowledge.add(sentence)
+    for column in zip(*board):
+        for sentence in at_most_one(column):
+            knowledge.add(sentence)
+
+    # Squares on the same diagonal share row - column or row + column
+    diagonals = {}
+    for row in range(n):
+        for column in range(n):
+            for key in (("down", row - column), ("up", row + column)):
+                diagonals.setdefault(key, []).append(board[row][column])
+    for diagonal in diagonals.values():
+        for sentence in at_most_one(diagonal):
+            knowledge.add(sentence)
+    return knowledge
+
+
+def pigeonhole(holes):
+    """
+    Returns the pigeonhole principle for `holes` holes, whose knowledge
+    base has no models: each of `holes` + 1 pigeons in a hole, with a
+    symbol "pigeon {pigeon} in {hole}" each, and no two in the same hole.
+    """
+    knowledge = And()
+    for pigeon in range(holes + 1):
+        knowledge.add(Or(*[Symbol(f"pigeon {pigeon} in {hole}")
+                           for hole in range(holes)]))
+    for hole in range(holes):
+        for sentence in at_most_one([Symbol(f"pigeon {pigeon} in {hole}")
+                                     for pigeon in range(holes + 1)]):
+            knowledge.add(sentence)
+    return knowledge
+
+
+def clue(cards, players=3, seed=0):
+    """
+    Returns a game of Clue with `cards` characters, weapons and rooms
+    each, dealt at random between `players` players once one card of
+    each kind is put in the envelope. Symbol "{card}{place}" is true if
+    the card is in place 0, the envelope, or with player 1 and onwards.
+    Player 1 knows their own cards and has seen one card of every other
+    player.
+    """
+    generator = random.Random(seed)
+    kinds = [[f"{kind}{i}" for i in range(cards)]
+             for kind in ("character", "weapon", "room")]
+    places = range(players + 1)
+
+    knowledge = And()
+    for kind in kinds:
+        for sentence in exactly_one([Symbol(f"{card}0") for card in kind]):
+            knowledge.add(sentence)
+    for card in [card for kind in kinds for card in kind]:
+        for sentence in exactly_one([Symbol(f"{card}{place}")
+                                     for place in places]):
+            knowledge.add(sentence)
+
+    # Deal the cards left after filling the envelope
+    deck = []
+    for kind in kinds:
+        hidden = generator.choice(kind)
+        deck.extend(card for card in kind if card != hidden)
+    generator.shuffle(deck)
+    hands = {player: deck[player - 1::players] for player in places[1:]}
+
+    for card in hands[1]:
+        knowledge.add(Symbol(f"{card}1"))
+    for player in places[2:]:
+        if hands[player]:
+            knowledge.add(Symbol(f"{generator.choice(hands[player])}"
+                                 f"{player}"))
+    return knowledge
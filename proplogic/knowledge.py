@@ -0,0 +1,61 @@
+from proplogic.sat import CNF, Solver
+from proplogic.sentences import And
+
+
+class KnowledgeBase(And):
+    """
+    A conjunction of facts that answers many entailment queries.
+
+    Facts are converted to clauses once, as they are added, and given to
+    one SAT solver that keeps what it learns from query to query. Every
+    model of the facts that the solver finds is kept, so that a query one
+    of them falsifies is answered without solving. A query entailed once
+    stays entailed as facts are added, and kept models that a new fact
+    falsifies are dropped.
+    """
+
+    def __init__(self, *conjuncts):
+        super().__init__(*conjuncts)
+        self.clauses = CNF()
+        self.solver = Solver()
+        self.given = 0
+        self.models = []
+        self.entailed = set()
+        for conjunct in self.conjuncts:
+            self.clauses.add(conjunct)
+
+    def __repr__(self):
+        conjunctions = ", ".join(
+            [str(conjunct) for conjunct in self.conjuncts]
+        )
+        return f"KnowledgeBase({conjunctions})"
+
+    def add(self, conjunct):
+        super().add(conjunct)
+        self.clauses.add(conjunct)
+        symbols = conjunct.symbols()
+        self.models = [model for model in self.models
+                       if symbols <= model.keys() and conjunct.evaluate(model)]
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        if query in self.entailed:
+            return True
+        symbols = query.symbols()
+        for model in self.models:
+            if symbols <= model.keys() and not query.evaluate(model):
+                return False
+
+        # Look for a model of the facts where the query is false
+        literal = self.clauses.literal(query)
+        for clause in self.clauses.clauses[self.given:]:
+            self.solver.add_clause(clause)
+        self.given = len(self.clauses.clauses)
+        if self.solver.solve([-literal]):
+            names = self.clauses.names
+            self.models.append({names[variable]: value
+                                for variable, value in self.solver.model.items()
+                                if variable in names})
+            return False
+        self.entailed.add(query)
+        return True
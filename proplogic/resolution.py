@@ -0,0 +1,346 @@
+import heapq
+import itertools
+
+from proplogic.sat import CNF, Solver
+from proplogic.sentences import (And, Biconditional, Implication, Not, Or,
+                                 Symbol)
+
+# Largest number of clauses distributing a disjunction may give, beyond
+# which the subsentence gets a variable of its own instead
+EXPANSION_LIMIT = 64
+
+# Clauses up to this long are checked for subsumption by looking up each
+# of their subsets, longer ones by scanning the clauses sharing a literal
+SUBSET_LOOKUP = 8
+
+# Largest number of resolvents a refutation derives before giving up,
+# since saturating the clauses to show that none exists can take
+# exponentially long
+RESOLVENT_LIMIT = 20000
+
+# Returned by `refute` when it gives up at its limit, undecided
+UNDECIDED = object()
+
+
+class Resolver():
+    """
+    Proves that a knowledge base entails queries by resolution
+    refutation: the clauses of the knowledge base and of the negated
+    query are resolved together until the empty clause (a contradiction)
+    comes out, or until nothing new does. Sentences are turned into
+    clauses by distribution (see `expand`) rather than through a
+    variable per subsentence, which resolution would otherwise spend
+    most of its time resolving away.
+
+    Only resolvents with an ancestor in the negated query are derived
+    (the set-of-support strategy), which is complete as long as the
+    knowledge base is consistent: when that search runs dry, the query is
+    not entailed unless the knowledge base is inconsistent, which is
+    checked once by resolving its own clauses, since an inconsistent
+    knowledge base entails everything.
+
+    Either search gives up after deriving RESOLVENT_LIMIT resolvents. Only
+    then does the SAT solver decide instead, and resolution resumes
+    without a limit when it finds that a proof exists.
+    """
+
+    def __init__(self, knowledge):
+        self.knowledge = knowledge
+        self.checked = False
+        self.contradiction = None
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.prove(query) is not None
+
+    def prove(self, query):
+        """
+        Returns a resolution proof that the knowledge base entails query
+        (see `refute`), with clauses as tuples of literal names, or None
+        if it does not.
+        """
+        clauses = CNF()
+        usable = expand(self.knowledge, True, clauses)
+        support = expand(query, False, clauses)
+        # Definitions of subsentence variables hold in every model
+        usable.extend(frozenset(clause) for clause in clauses.clauses)
+
+        refutation = refute(usable, support, RESOLVENT_LIMIT)
+        if refutation is UNDECIDED:
+            if Solver(usable + support).solve():
+                return None
+            refutation = refute(usable, support)
+        if refutation is None:
+            return self.inconsistency()
+        return explain(refutation, literal_names(clauses))
+
+    def inconsistency(self):
+        """
+        Returns a resolution proof that the knowledge base is inconsistent
+        (see `prove`), or None if it is not, looked for only once.
+        """
+        if not self.checked:
+            clauses = CNF()
+            usable = expand(self.knowledge, True, clauses)
+            usable.extend(frozenset(clause) for clause in clauses.clauses)
+            refutation = refute([], usable, RESOLVENT_LIMIT)
+            if refutation is UNDECIDED:
+                refutation = None
+                if not Solver(usable).solve():
+                    refutation = refute([], usable)
+            if refutation is not None:
+                self.contradiction = explain(refutation,
+                                             literal_names(clauses))
+            self.checked = True
+        return self.contradiction
+
+
+def expand(sentence, positive, clauses):
+    """
+    Returns the clauses (frozensets of literals) of `sentence`, or of its
+    negation if not `positive`, numbering symbols with the CNF `clauses`.
+    The clauses are expanded by distributing disjunctions over
+    conjunctions, which adds no variables, except that a subsentence
+    whose distribution would give more than EXPANSION_LIMIT clauses is
+    replaced by its literal in `clauses` (whose definition is added
+    there).
+    """
+    if isinstance(sentence, Symbol):
+        variable = clauses.variable(sentence.name)
+        return [frozenset([variable if positive else -variable])]
+    if isinstance(sentence, Not):
+        return expand(sentence.operand, not positive, clauses)
+
+    if isinstance(sentence, And):
+        parts = [expand(conjunct, positive, clauses)
+                 for conjunct in sentence.conjuncts]
+        expanded = conjoin(parts) if positive else disjoin(parts)
+    elif isinstance(sentence, Or):
+        parts = [expand(disjunct, positive, clauses)
+                 for disjunct in sentence.disjuncts]
+        expanded = disjoin(parts) if positive else conjoin(parts)
+    elif isinstance(sentence, Implication):
+        antecedent = expand(sentence.antecedent, not positive, clauses)
+        consequent = expand(sentence.consequent, positive, clauses)
+        if positive:
+            expanded = disjoin([antecedent, consequent])
+        else:
+            expanded = conjoin([antecedent, consequent])
+    elif isinstance(sentence, Biconditional):
+        # Either (¬left ∨ right) ∧ (left ∨ ¬right), or its negation
+        # (left ∨ right) ∧ (¬left ∨ ¬right)
+        left = expand(sentence.left, True, clauses)
+        right = expand(sentence.right, True, clauses)
+        not_left = expand(sentence.left, False, clauses)
+        not_right = expand(sentence.right, False, clauses)
+        if positive:
+            expanded = conjoin([disjoin([not_left, right]),
+                                disjoin([left, not_right])])
+        else:
+            expanded = conjoin([disjoin([left, right]),
+                                disjoin([not_left, not_right])])
+    else:
+        raise TypeError("must be a logical sentence")
+
+    if expanded is None:
+        literal = clauses.literal(sentence)
+        return [frozenset([literal if positive else -literal])]
+    return expanded
+
+
+def conjoin(parts):
+    """Returns the clauses of the conjunction of lists of clauses."""
+    return [clause for part in parts for clause in part]
+
+
+def disjoin(parts):
+    """
+    Returns the clauses of the disjunction of lists of clauses, leaving
+    out tautologies, or None if there would be more than
+    EXPANSION_LIMIT of them.
+    """
+    result = [frozenset()]
+    for part in parts:
+        if len(result) * len(part) > EXPANSION_LIMIT:
+            return None
+        result = [clause | other for clause in result for other in part
+                  if not any(-literal in other for literal in clause)]
+    return result
+
+
+def refute(usable, support, limit=None):
+    """
+    Resolves the clauses `usable` and `support` (collections of frozensets
+    of literals), each new clause with at least one parent descending from
+    `support`, until the empty clause is derived.
+
+    Clauses are indexed by their literals, so each clause is only
+    resolved against the clauses holding the complement of one of its
+    literals. Tautologies are dropped, and so are clauses subsumed by
+    (that is, containing every literal of) another clause, old or new.
+    Support clauses are resolved shortest first.
+
+    Returns (clauses, parents, empty): every clause kept, the pair of
+    clauses each was resolved from (None for the given clauses, which
+    come first, `usable` then `support`), and the position of the empty
+    clause. Returns None if the empty clause cannot be derived, and
+    UNDECIDED if it is not derived from the first `limit` resolvents.
+    """
+    clauses = []
+    parents = []
+    alive = set()
+    present = set()
+    seen = set()
+    index = {}
+    active = set()
+    waiting = []
+    derived = 0
+
+    def keep(clause, origin):
+        """
+        Keeps `clause` and returns its position, or returns None if it is
+        a tautology or subsumed.
+        """
+        # A clause seen before is kept or subsumed already
+        if clause in seen:
+            return None
+        seen.add(clause)
+        if any(-literal in clause for literal in clause):
+            return None
+        if len(clause) <= SUBSET_LOOKUP:
+            for size in range(1, len(clause)):
+                for subset in itertools.combinations(clause, size):
+                    if frozenset(subset) in present:
+                        return None
+        else:
+            for literal in clause:
+                for other in index.get(literal, ()):
+                    if clauses[other] <= clause:
+                        return None
+
+        # Forget the clauses this one subsumes
+        if clause:
+            rarest = min(clause,
+                         key=lambda literal: len(index.get(literal, ())))
+            for other in list(index.get(rarest, ())):
+                if clause <= clauses[other]:
+                    alive.discard(other)
+                    present.discard(clauses[other])
+                    active.discard(other)
+                    for literal in clauses[other]:
+                        index[literal].discard(other)
+
+        position = len(clauses)
+        clauses.append(clause)
+        parents.append(origin)
+        alive.add(position)
+        present.add(clause)
+        for literal in clause:
+            index.setdefault(literal, set()).add(position)
+        return position
+
+    for clause in usable:
+        position = keep(clause, None)
+        if position is not None:
+            active.add(position)
+            if not clause:
+                return clauses, parents, position
+    for clause in support:
+        position = keep(clause, None)
+        if position is not None:
+            if not clause:
+                return clauses, parents, position
+            heapq.heappush(waiting, (len(clause), position))
+
+    while waiting:
+        _, given = heapq.heappop(waiting)
+        if given not in alive:
+            continue
+        active.add(given)
+        clause = clauses[given]
+        for literal in clause:
+            for partner in list(index.get(-literal, ())):
+                if partner not in active:
+                    continue
+                derived += 1
+                if limit is not None and derived > limit:
+                    return UNDECIDED
+                resolvent = ((clause - {literal})
+                             | (clauses[partner] - {-literal}))
+                position = keep(resolvent, (given, partner))
+                if position is None:
+                    continue
+                if not resolvent:
+                    return clauses, parents, position
+                heapq.heappush(waiting, (len(resolvent), position))
+    return None
+
+
+def literal_names(clauses):
+    """
+    Returns a function naming the literals of `clauses` (a CNF): symbols
+    by name, and the variables of subsentences by their formula (or their
+    representation, when different subsentences share a formula).
+    """
+    names = dict(clauses.names)
+    taken = set(names.values())
+    for sentence, variable in clauses.definitions.items():
+        name = f"[{sentence.formula()}]"
+        if name in taken:
+            name = f"[{sentence!r}]"
+        names[variable] = name
+        taken.add(name)
+
+    def name(literal):
+        if literal > 0:
+            return names[literal]
+        return "¬" + names[-literal]
+
+    return name
+
+
+def explain(refutation, name):
+    """
+    Returns the steps of a refutation that lead to its empty clause, in
+    order, as (clause, parents) pairs: each clause a sorted tuple of
+    literal names, and its parents a pair of positions of earlier steps,
+    or None for a clause of the knowledge base or the negated query.
+    """
+    clauses, parents, empty = refutation
+    needed = set()
+    pending = [empty]
+    while pending:
+        position = pending.pop()
+        if position not in needed:
+            needed.add(position)
+            if parents[position] is not None:
+                pending.extend(parents[position])
+
+    order = sorted(needed)
+    step = {position: i for i, position in enumerate(order)}
+    return [
+        (tuple(sorted(name(literal) for literal in clauses[position])),
+         None if parents[position] is None
+         else tuple(step[parent] for parent in parents[position]))
+        for position in order
+    ]
+
+
+def format_proof(proof):
+    """Returns a resolution proof as text, one numbered step per line."""
+    lines = []
+    for i, (clause, parents) in enumerate(proof, 1):
+        text = " ∨ ".join(clause) if clause else "□"
+        reason = ("given" if parents is None
+                  else "from " + ", ".join(str(parent + 1)
+                                           for parent in parents))
+        lines.append(f"{i:>4}. {text}    ({reason})")
+    return "\n".join(lines)
+
+
+def prove(knowledge, query):
+    """
+    Returns a resolution proof that knowledge base entails query (see
+    `Resolver.prove`), or None if it does not.
+    """
+    return Resolver(knowledge).prove(query)
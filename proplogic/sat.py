@@ -0,0 +1,449 @@
+import heapq
+
+from proplogic.sentences import (And, Biconditional, Implication, Not, Or,
+                                 Symbol)
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form, over numbered variables: each
+    clause is a list of nonzero integers, `v` meaning that variable `v`
+    is true and `-v` that it is false (as in the DIMACS format).
+
+    Symbols are numbered 1, 2, ... as they are added. Sentences that are
+    clauses already (disjunctions of symbols and negated symbols) are
+    added as they are; any other subsentence gets a fresh variable that
+    is defined to be equivalent to it (the Tseitin transformation), so
+    the clauses grow linearly with the sentences and every model of the
+    sentences extends to exactly one model of the clauses.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.names = {}
+        self.count = 0
+        self.clauses = []
+        self.definitions = {}
+
+    def variable(self, name):
+        """Returns the variable of the symbol called `name`."""
+        try:
+            return self.variables[name]
+        except KeyError:
+            self.count += 1
+            self.variables[name] = self.count
+            self.names[self.count] = name
+            return self.count
+
+    def add(self, sentence):
+        """Adds clauses that are true exactly when `sentence` is."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+            return
+        if isinstance(sentence, Not):
+            operand = sentence.operand
+            if isinstance(operand, Not):
+                self.add(operand.operand)
+                return
+            if isinstance(operand, Or):
+                for disjunct in operand.disjuncts:
+                    self.add(Not(disjunct))
+                return
+            if isinstance(operand, Implication):
+                self.add(operand.antecedent)
+                self.add(Not(operand.consequent))
+                return
+        if isinstance(sentence, Implication):
+            if isinstance(sentence.consequent, And):
+                for conjunct in sentence.consequent.conjuncts:
+                    self.add(Implication(sentence.antecedent, conjunct))
+                return
+        if isinstance(sentence, Biconditional):
+            self.add(Implication(sentence.left, sentence.right))
+            self.add(Implication(sentence.right, sentence.left))
+            return
+
+        clause = self.clause(sentence)
+        if clause is None:
+            clause = [self.literal(sentence)]
+        self.clauses.append(clause)
+
+    def clause(self, sentence):
+        """
+        Returns `sentence` as a clause if it is a disjunction of symbols
+        and negated symbols, and None otherwise.
+        """
+        if isinstance(sentence, Symbol):
+            return [self.variable(sentence.name)]
+        if isinstance(sentence, Not):
+            operand = sentence.operand
+            if isinstance(operand, Symbol):
+                return [-self.variable(operand.name)]
+            if isinstance(operand, Not):
+                return self.clause(operand.operand)
+            if isinstance(operand, And):
+                return self.disjunction(Not(conjunct)
+                                        for conjunct in operand.conjuncts)
+            return None
+        if isinstance(sentence, Or):
+            return self.disjunction(sentence.disjuncts)
+        if isinstance(sentence, Implication):
+            return self.disjunction([Not(sentence.antecedent),
+                                     sentence.consequent])
+        return None
+
+    def disjunction(self, sentences):
+        """
+        Returns the clause of the disjunction of `sentences`, or None if
+        one of them is not a clause.
+        """
+        literals = []
+        for sentence in sentences:
+            clause = self.clause(sentence)
+            if clause is None:
+                return None
+            literals.extend(clause)
+        return literals
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses
+        that define it. Equal subsentences share the same literal.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if isinstance(sentence, And) and len(sentence.conjuncts) == 1:
+            return self.literal(sentence.conjuncts[0])
+        if isinstance(sentence, Or) and len(sentence.disjuncts) == 1:
+            return self.literal(sentence.disjuncts[0])
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            literals = [self.literal(conjunct)
+                        for conjunct in sentence.conjuncts]
+            gate = self.fresh()
+            self.clauses.extend([-gate, literal] for literal in literals)
+            self.clauses.append([gate] + [-literal for literal in literals])
+        elif isinstance(sentence, Or):
+            literals = [self.literal(disjunct)
+                        for disjunct in sentence.disjuncts]
+            gate = self.fresh()
+            self.clauses.extend([gate, -literal] for literal in literals)
+            self.clauses.append([-gate] + literals)
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            gate = self.fresh()
+            self.clauses.append([-gate, -antecedent, consequent])
+            self.clauses.append([gate, antecedent])
+            self.clauses.append([gate, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            gate = self.fresh()
+            self.clauses.append([-gate, -left, right])
+            self.clauses.append([-gate, left, -right])
+            self.clauses.append([gate, left, right])
+            self.clauses.append([gate, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.definitions[sentence] = gate
+        return gate
+
+    def fresh(self):
+        """Returns a new variable standing for no symbol."""
+        self.count += 1
+        return self.count
+
+
+class Solver():
+    """
+    Conflict-driven clause learning (CDCL) SAT solver.
+
+    Every clause watches its first two literals and is only looked at
+    when one of them becomes false: it then watches another literal that
+    is not false or, when there is none, implies its other watched
+    literal (unit propagation) or is in conflict. A conflict is traced
+    back through the clauses that implied it to the first unique
+    implication point, learned as a new clause, and the search jumps back
+    to the level where that clause implies something new. Decisions pick
+    the variables involved in the most recent conflicts first.
+
+    Clauses can be added between calls to `solve`, and every call can
+    assume some literals to be true, so that one solver answers many
+    related questions while keeping the clauses it learned.
+    """
+
+    # Factor by which the activity of variables in past conflicts decays
+    DECAY = 0.95
+
+    # Number of conflicts before the first restart, and its growth
+    RESTART = 100
+    RESTART_GROWTH = 1.5
+
+    def __init__(self, clauses=()):
+        # Per variable: 1 if true, -1 if false and 0 if unassigned, the
+        # decision level it was assigned at, the clause that implied it,
+        # its activity and the value it had last
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+
+        self.watches = {}
+        self.clauses = []
+        self.learned = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.consistent = True
+        self.model = None
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def reserve(self, variable):
+        """Makes room for every variable up to `variable`."""
+        for new in range(len(self.values), variable + 1):
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(False)
+            self.watches[new] = []
+            self.watches[-new] = []
+            heapq.heappush(self.heap, (0.0, new))
+
+    def value(self, literal):
+        """Returns 1 if `literal` is true, -1 if false and 0 if unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause (an iterable of nonzero integers), returning False
+        if the clauses can no longer be satisfied.
+        """
+        if not self.consistent:
+            return False
+        self.backtrack(0)
+
+        literals = []
+        for literal in clause:
+            self.reserve(abs(literal))
+            value = self.value(literal)
+            if value == 1 or -literal in literals:
+                # Always true, nothing to add
+                return True
+            if value == 0 and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.consistent = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.consistent = False
+        else:
+            self.clauses.append(literals)
+            self.watch(literals)
+        return self.consistent
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by the clauses, returning a clause
+        in conflict, or None if there is none.
+        """
+        values = self.values
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            for position, clause in enumerate(watching):
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if (value if first > 0 else -value) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for other in range(2, len(clause)):
+                    literal = clause[other]
+                    value = values[abs(literal)]
+                    if (value if literal > 0 else -value) != -1:
+                        clause[1], clause[other] = literal, false
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    value = values[abs(first)]
+                    if (value if first > 0 else -value) == -1:
+                        kept.extend(watching[position + 1:])
+                        watches[false] = kept
+                        return clause
+                    self.assign(first, clause)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a clause in conflict, whose first
+        literal is implied once the search jumps back to the level of its
+        second one, and that level.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [0]
+        pending = 0
+        index = len(self.trail)
+        clause = conflict
+        literal = 0
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if (other != literal and variable not in seen
+                        and self.levels[variable] > 0):
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve on the latest assigned literal of this level
+            index -= 1
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        latest = max(range(1, len(learned)),
+                     key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[latest] = learned[latest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            # Rescale before floats overflow
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[variable], variable)
+                         for variable in range(1, len(self.values))
+                         if self.values[variable] == 0]
+            heapq.heapify(self.heap)
+
+    def backtrack(self, level):
+        """Undoes every assignment made after decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            self.phases[variable] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the literal to try next, the most active unassigned
+        variable with the value it had last, or 0 if all are assigned.
+        """
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if self.values[variable] == 0:
+                return variable if self.phases[variable] else -variable
+        return 0
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses can be satisfied with every literal of
+        `assumptions` true, leaving a satisfying assignment in `model`
+        (a dictionary from variables to truth values), and False if not.
+        """
+        self.model = None
+        if not self.consistent:
+            return False
+        self.backtrack(0)
+        for literal in assumptions:
+            self.reserve(abs(literal))
+
+        conflicts = 0
+        restart = self.RESTART
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.consistent = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.watch(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= self.DECAY
+                conflicts += 1
+                continue
+
+            if conflicts >= restart:
+                self.backtrack(0)
+                conflicts = 0
+                restart = int(restart * self.RESTART_GROWTH)
+
+            # Assume the next assumption, or decide on a variable
+            level = len(self.limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value == -1:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            literal = self.decide()
+            if literal == 0:
+                self.model = {variable: self.values[variable] == 1
+                              for variable in range(1, len(self.values))}
+                self.backtrack(0)
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(literal, None)
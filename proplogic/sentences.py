@@ -0,0 +1,425 @@
+import weakref
+
+
+class Sentence():
+    """
+    Logical sentences are immutable and hash-consed: building a sentence
+    equal to one that still exists returns that same object, so equal
+    subsentences are shared, and their hash, symbols and formula are
+    computed once. The exception is And, whose `add` changes it in place:
+    sentences with an And inside are not shared, and an And should not be
+    changed once it is part of another sentence.
+    """
+
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    # Every shared sentence that still exists, by class and arguments
+    shared = weakref.WeakValueDictionary()
+
+    @classmethod
+    def build(cls, arguments, children):
+        """
+        Returns the sentence of class `cls` built from `arguments`, which
+        has `children` as subsentences, reusing an equal sentence if one
+        exists. Subclasses set their own attributes on a new sentence.
+        """
+        key = (cls, arguments)
+        share = not any(isinstance(child, And) for child in children)
+        if share:
+            sentence = Sentence.shared.get(key)
+            if sentence is not None:
+                return sentence, False
+        sentence = object.__new__(cls)
+        object.__setattr__(sentence, "_hash", hash(key))
+        object.__setattr__(sentence, "_symbols", frozenset().union(
+            *[child.symbols() for child in children]
+        ))
+        object.__setattr__(sentence, "_formula", None)
+        if share:
+            Sentence.shared[key] = sentence
+        return sentence, True
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def evaluate(self, model):
+        """Evaluates the logical sentence."""
+        raise Exception("nothing to evaluate")
+
+    def formula(self):
+        """Returns string formula representing logical sentence."""
+        return ""
+
+    def symbols(self):
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self._symbols
+
+    def expression(self, index):
+        """
+        Returns a Python expression evaluating the logical sentence over a
+        sequence `m` of truth values, where `index` maps symbol names to
+        their positions in `m`.
+        """
+        raise Exception("nothing to evaluate")
+
+    def bits(self, columns, mask):
+        """
+        Evaluates the logical sentence in every model at once: `columns`
+        maps each symbol name to an integer whose bit `j` is the symbol's
+        value in model `j`, and `mask` has a bit set for every model.
+        Returns the integer of the sentence's values.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, symbols=None):
+        """
+        Compiles the logical sentence into a function of a sequence of
+        truth values, one per name in `symbols` (all the sentence's
+        symbols, sorted, by default).
+        """
+        if symbols is None:
+            symbols = sorted(self.symbols())
+        index = {name: i for i, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda m: {self.expression(index)}")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Too deeply nested for the parser, walk the tree instead
+            return lambda m: self.evaluate(dict(zip(symbols, m)))
+
+    @classmethod
+    def validate(cls, sentence):
+        if not isinstance(sentence, Sentence):
+            raise TypeError("must be a logical sentence")
+
+    @classmethod
+    def parenthesize(cls, s):
+        """Parenthesizes an expression if not already parenthesized."""
+        def balanced(s):
+            """Checks if a string has balanced parentheses."""
+            count = 0
+            for c in s:
+                if c == "(":
+                    count += 1
+                elif c == ")":
+                    if count <= 0:
+                        return False
+                    count -= 1
+            return count == 0
+        if not len(s) or s.isalpha() or (
+            s[0] == "(" and s[-1] == ")" and balanced(s[1:-1])
+        ):
+            return s
+        else:
+            return f"({s})"
+
+
+def cached_formula(formula):
+    """Caches the formula of a sentence until the sentence changes."""
+    def cached(self):
+        if self._formula is None:
+            object.__setattr__(self, "_formula", formula(self))
+        return self._formula
+    cached.__doc__ = formula.__doc__
+    return cached
+
+
+class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        symbol, new = cls.build((name,), ())
+        if new:
+            object.__setattr__(symbol, "name", name)
+            object.__setattr__(symbol, "_symbols", frozenset([name]))
+        return symbol
+
+    def __reduce__(self):
+        return (type(self), (self.name,))
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
+
+    __hash__ = Sentence.__hash__
+
+    def __repr__(self):
+        return self.name
+
+    def evaluate(self, model):
+        try:
+            return bool(model[self.name])
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def formula(self):
+        return self.name
+
+    def expression(self, index):
+        try:
+            return f"m[{index[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def bits(self, columns, mask):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+
+class Not(Sentence):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        sentence, new = cls.build((operand,), (operand,))
+        if new:
+            object.__setattr__(sentence, "operand", operand)
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.operand,))
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
+
+    __hash__ = Sentence.__hash__
+
+    def __repr__(self):
+        return f"Not({self.operand})"
+
+    def evaluate(self, model):
+        return not self.operand.evaluate(model)
+
+    @cached_formula
+    def formula(self):
+        return "¬" + Sentence.parenthesize(self.operand.formula())
+
+    def expression(self, index):
+        return f"(not {self.operand.expression(index)})"
+
+    def bits(self, columns, mask):
+        return mask ^ self.operand.bits(columns, mask)
+
+
+class And(Sentence):
+    __slots__ = ("conjuncts",)
+
+    # Unlike other sentences, a conjunction can grow (see `add`)
+    __setattr__ = object.__setattr__
+    __delattr__ = object.__delattr__
+
+    def __init__(self, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        self.conjuncts = list(conjuncts)
+        self._hash = None
+        self._symbols = None
+        self._formula = None
+
+    def __reduce__(self):
+        return (type(self), tuple(self.conjuncts))
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((And, tuple(self.conjuncts)))
+        return self._hash
+
+    def __repr__(self):
+        conjunctions = ", ".join(
+            [str(conjunct) for conjunct in self.conjuncts]
+        )
+        return f"And({conjunctions})"
+
+    def add(self, conjunct):
+        Sentence.validate(conjunct)
+        self.conjuncts.append(conjunct)
+        self._hash = None
+        self._formula = None
+        if self._symbols is not None:
+            self._symbols |= conjunct.symbols()
+
+    def evaluate(self, model):
+        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+
+    @cached_formula
+    def formula(self):
+        if len(self.conjuncts) == 1:
+            return self.conjuncts[0].formula()
+        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
+                           for conjunct in self.conjuncts])
+
+    def symbols(self):
+        if self._symbols is None:
+            self._symbols = frozenset().union(
+                *[conjunct.symbols() for conjunct in self.conjuncts]
+            )
+        return self._symbols
+
+    def expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(conjunct.expression(index)
+                                  for conjunct in self.conjuncts) + ")"
+
+    def bits(self, columns, mask):
+        result = mask
+        for conjunct in self.conjuncts:
+            result &= conjunct.bits(columns, mask)
+        return result
+
+
+class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        sentence, new = cls.build(disjuncts, disjuncts)
+        if new:
+            object.__setattr__(sentence, "disjuncts", disjuncts)
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), self.disjuncts)
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
+
+    __hash__ = Sentence.__hash__
+
+    def __repr__(self):
+        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
+        return f"Or({disjuncts})"
+
+    def evaluate(self, model):
+        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+
+    @cached_formula
+    def formula(self):
+        if len(self.disjuncts) == 1:
+            return self.disjuncts[0].formula()
+        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
+                            for disjunct in self.disjuncts])
+
+    def expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(disjunct.expression(index)
+                                 for disjunct in self.disjuncts) + ")"
+
+    def bits(self, columns, mask):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.bits(columns, mask)
+        return result
+
+
+class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
+        Sentence.validate(antecedent)
+        Sentence.validate(consequent)
+        arguments = (antecedent, consequent)
+        sentence, new = cls.build(arguments, arguments)
+        if new:
+            object.__setattr__(sentence, "antecedent", antecedent)
+            object.__setattr__(sentence, "consequent", consequent)
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.antecedent, self.consequent))
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
+
+    __hash__ = Sentence.__hash__
+
+    def __repr__(self):
+        return f"Implication({self.antecedent}, {self.consequent})"
+
+    def evaluate(self, model):
+        return ((not self.antecedent.evaluate(model))
+                or self.consequent.evaluate(model))
+
+    @cached_formula
+    def formula(self):
+        antecedent = Sentence.parenthesize(self.antecedent.formula())
+        consequent = Sentence.parenthesize(self.consequent.formula())
+        return f"{antecedent} => {consequent}"
+
+    def expression(self, index):
+        antecedent = self.antecedent.expression(index)
+        consequent = self.consequent.expression(index)
+        return f"((not {antecedent}) or {consequent})"
+
+    def bits(self, columns, mask):
+        antecedent = self.antecedent.bits(columns, mask)
+        return (mask ^ antecedent) | self.consequent.bits(columns, mask)
+
+
+class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
+        Sentence.validate(left)
+        Sentence.validate(right)
+        arguments = (left, right)
+        sentence, new = cls.build(arguments, arguments)
+        if new:
+            object.__setattr__(sentence, "left", left)
+            object.__setattr__(sentence, "right", right)
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.left, self.right))
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
+
+    __hash__ = Sentence.__hash__
+
+    def __repr__(self):
+        return f"Biconditional({self.left}, {self.right})"
+
+    def evaluate(self, model):
+        return ((self.left.evaluate(model)
+                 and self.right.evaluate(model))
+                or (not self.left.evaluate(model)
+                    and not self.right.evaluate(model)))
+
+    @cached_formula
+    def formula(self):
+        left = Sentence.parenthesize(str(self.left))
+        right = Sentence.parenthesize(str(self.right))
+        return f"{left} <=> {right}"
+
+    def expression(self, index):
+        left = self.left.expression(index)
+        right = self.right.expression(index)
+        return f"(bool({left}) == bool({right}))"
+
+    def bits(self, columns, mask):
+        left = self.left.bits(columns, mask)
+        return mask ^ left ^ self.right.bits(columns, mask)
@@ -1,6 +1,6 @@
 import termcolor
 
-from logic import Symbol, Not, And, Or, Implication, model_check
+from logic import Symbol, Not, And, Or, Implication, marginals
 
 # Enter characters, weapons and rooms
 characters = ["Mostarda", "Black", "Violeta",
@@ -74,10 +74,12 @@ for card in cards:
 
 
 def check_knowledge(knowledge):
+    # Count the models where each symbol is true, all in one pass
+    total, trues = marginals(knowledge, [symbol.name for symbol in symbols])
     for symbol in symbols:
-        if model_check(knowledge, symbol):
+        if trues[symbol.name] == total:
             termcolor.cprint(f"{symbol}: YES", "green")
-        elif not model_check(knowledge, Not(symbol)):
+        elif trues[symbol.name] > 0:
             print(f"{symbol}: MAYBE")
 
 """
@@ -106,4 +108,5 @@ knowledge.add(Symbol("Cano1"))
 knowledge.add(Symbol("Hall1"))
 
 
-check_knowledge(knowledge)
+if __name__ == "__main__":
+    check_knowledge(knowledge)
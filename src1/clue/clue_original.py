@@ -49,4 +49,5 @@ knowledge.add(Or(
 knowledge.add(Not(plum))
 knowledge.add(Not(ballroom))
 
-check_knowledge(knowledge)
+if __name__ == "__main__":
+    check_knowledge(knowledge)